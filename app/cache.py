@@ -0,0 +1,44 @@
+"""
+Small in-process TTL cache for query results
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from app.constants import RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL_SECONDS
+
+class TTLCache:
+    """Bounded mapping whose entries expire ttl seconds after being stored"""
+
+    def __init__(self, maxsize: int = RESULT_CACHE_MAX_ENTRIES, ttl: float = RESULT_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Endpoints run in FastAPI's threadpool, so guard the shared dict
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store value under key, evicting the oldest entry when full"""
+        with self._lock:
+            self._data.pop(key, None)
+            if len(self._data) >= self.maxsize:
+                self._data.popitem(last=False)
+            self._data[key] = (time.monotonic(), value)
+
+    def clear(self):
+        """Remove all cached values"""
+        with self._lock:
+            self._data.clear()
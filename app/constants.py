@@ -9,6 +9,30 @@ Centraliza todas as configurações para fácil manutenção
 OLLAMA_MODEL = "qwen3:30b"  # Modelo especificado pelo usuário
 OLLAMA_BASE_URL = "http://localhost:11434"
 OLLAMA_TEMPERATURE = 0
+OLLAMA_KEEP_ALIVE = 1800  # segundos que o modelo fica carregado na memória entre perguntas
+OLLAMA_MAX_KEEPALIVE_CONNECTIONS = 10
+
+# Cache de respostas do LLM (seguro porque a temperatura é 0)
+LLM_CACHE_DATABASE_PATH = ".langchain_cache.db"
+
+# Cache semântico: reutiliza respostas para perguntas parecidas
+OLLAMA_EMBEDDING_MODEL = "nomic-embed-text"
+SEMANTIC_CACHE_SIMILARITY_THRESHOLD = 0.92
+SEMANTIC_CACHE_TTL_SECONDS = 3600
+SEMANTIC_CACHE_MAX_ENTRIES = 256
+# Depois de uma falha do modelo de embeddings, tenta de novo após este intervalo
+SEMANTIC_CACHE_RETRY_SECONDS = 30
+# Palavras que mudam o período perguntado (sem acentos; os meses vêm de MONTHS_PT):
+# duas perguntas só compartilham resposta se tiverem os mesmos números e estas palavras
+SEMANTIC_CACHE_PERIOD_WORDS = frozenset({
+    'hoje', 'ontem', 'dia', 'semana', 'mes', 'trimestre', 'semestre', 'ano',
+    'este', 'esta', 'deste', 'desta', 'neste', 'nesta', 'atual',
+    'passado', 'passada', 'ultimo', 'ultima', 'ultimos', 'ultimas', 'anterior', 'proximo',
+    'january', 'february', 'march', 'april', 'may', 'june', 'july',
+    'august', 'september', 'october', 'november', 'december',
+    'today', 'yesterday', 'day', 'week', 'month', 'quarter', 'year',
+    'this', 'current', 'last', 'previous', 'next'
+})
 
 # ========================
 # CONFIGURAÇÕES DO MCP
@@ -17,6 +41,13 @@ MCP_SERVER_PORT = 8001
 MCP_SERVER_URL = f"http://localhost:{MCP_SERVER_PORT}/mcp"
 MCP_TRANSPORT = "streamable_http"
 
+# Limites da ferramenta query_sales_data (SQL livre gerado pelo modelo)
+MCP_QUERY_MAX_ROWS = 10000
+MCP_QUERY_FETCH_BATCH_SIZE = 1000
+
+# Conexões SQLite (somente leitura) compartilhadas pelas ferramentas; com WAL, leituras rodam em paralelo
+MCP_SQLITE_POOL_SIZE = 8
+
 # ========================
 # CONFIGURAÇÕES DA API
 # ========================
@@ -25,11 +56,20 @@ API_DESCRIPTION = "API for analyzing sales data using natural language queries p
 API_VERSION = "1.0.0"
 API_DEFAULT_PORT = 8080
 
+# Cabeçalhos de cache HTTP
+API_DATA_CACHE_CONTROL = "public, max-age=60"  # /top-products e /stats
+API_STATIC_CACHE_CONTROL = "public, max-age=3600, immutable"  # /
+
 # ========================
 # CONFIGURAÇÕES DO BANCO DE DADOS
 # ========================
 DATABASE_URL = "sqlite:///./sales.db"
 DATABASE_FILE = "sales.db"
+# Tabelas descritas ao modelo pela ferramenta get_database_schema
+DATABASE_TABLES = ("products", "customers", "sales")
+DATABASE_POOL_SIZE = 10
+DATABASE_MAX_OVERFLOW = 20
+DATABASE_POOL_RECYCLE_SECONDS = 1800
 
 # ========================
 # CONFIGURAÇÕES DE VALIDAÇÃO
@@ -42,6 +82,15 @@ SALES_KEYWORDS = [
     'statistics', 'trend', 'análise', 'analysis', 'valor', 'total',
     'hoje', 'semana', 'mês', 'venda', 'vendas'
 ]
+# Plurais que não são a palavra-chave + 's'
+SALES_KEYWORDS_IRREGULAR_PLURALS = [
+    'meses', 'valores', 'totais', 'quantities', 'categories', 'analyses'
+]
+# Formas aceitas das palavras-chave (singular e plural), pré-calculadas uma única vez
+SALES_KEYWORDS_SET = frozenset(
+    [form for keyword in SALES_KEYWORDS for form in (keyword.lower(), keyword.lower() + 's')]
+    + SALES_KEYWORDS_IRREGULAR_PLURALS
+)
 
 # ========================
 # MENSAGENS DE ERRO
@@ -73,6 +122,18 @@ MAX_TOP_PRODUCTS_LIMIT = 20
 # PERÍODO DE ANÁLISE
 # ========================
 ANALYSIS_PERIOD_DAYS = 365  # 12 meses para pegar os dados de demonstração
+SALES_DATE_RANGE_CACHE_TTL = 300  # segundos; o período dos dados muda raramente
+
+# Cache de resultados das consultas agregadas (/stats, /top-products e ferramentas MCP)
+RESULT_CACHE_TTL_SECONDS = 300
+RESULT_CACHE_MAX_ENTRIES = 64
+
+# Nomes dos meses em português (independente do locale do sistema)
+MONTHS_PT = {
+    1: 'janeiro', 2: 'fevereiro', 3: 'março', 4: 'abril',
+    5: 'maio', 6: 'junho', 7: 'julho', 8: 'agosto',
+    9: 'setembro', 10: 'outubro', 11: 'novembro', 12: 'dezembro'
+}
 
 # ========================
 # INFORMAÇÕES DO MODELO
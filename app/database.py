@@ -2,22 +2,54 @@
 Database configuration and connection management
 """
 import os
-from datetime import datetime
+import time
+from datetime import date, datetime
+from functools import lru_cache
 from typing import Tuple, Optional
-from sqlalchemy import create_engine, func, select
+from sqlalchemy import create_engine, event, func, inspect, select
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from langchain_community.utilities import SQLDatabase
-from app.constants import DATABASE_URL as DEFAULT_DATABASE_URL
+from app.constants import (
+    DATABASE_URL as DEFAULT_DATABASE_URL,
+    DATABASE_POOL_SIZE, DATABASE_MAX_OVERFLOW, DATABASE_POOL_RECYCLE_SECONDS,
+    SALES_DATE_RANGE_CACHE_TTL, MONTHS_PT
+)
+from app.rollups import ROLLUP_TABLES, ensure_rollups, refresh_rollups
 
 # Get database URL from environment variable or use default from constants
 DATABASE_URL = os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL)
 
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# Pool settings: LIFO checkout keeps reusing the most recently returned
+# (hottest) connection instead of cycling FIFO through every idle one, so
+# rarely used connections can time out and the warm one keeps its caches.
+engine_options = {
+    "pool_use_lifo": True,
+    "pool_pre_ping": True,
+    "pool_recycle": DATABASE_POOL_RECYCLE_SECONDS,
+}
+if IS_SQLITE:
+    engine_options["connect_args"] = {"check_same_thread": False}
+else:
+    engine_options["pool_size"] = DATABASE_POOL_SIZE
+    engine_options["max_overflow"] = DATABASE_MAX_OVERFLOW
+
 # Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-)
+engine = create_engine(DATABASE_URL, **engine_options)
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Tune SQLite for a read-heavy analytics workload"""
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers run concurrently with a writer; NORMAL is durable in WAL mode
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        # Memory-map up to 256 MB of the file so reads avoid read() syscalls
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
 
 # Create session maker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -25,12 +57,45 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Create declarative base
 Base = declarative_base()
 
-# Create LangChain SQLDatabase instance
-langchain_db = SQLDatabase(engine)
-
 def create_db_and_tables():
-    """Create database tables"""
-    Base.metadata.create_all(bind=engine)
+    """Create database tables that do not exist yet"""
+    # One table listing instead of create_all's per-table existence checks
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing_tables = [
+        table for table in Base.metadata.sorted_tables
+        if table.name not in existing_tables
+    ]
+    if missing_tables:
+        Base.metadata.create_all(bind=engine, tables=missing_tables)
+    
+    # Indexes added to the models after their table was created
+    created_indexes = False
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables or not table.indexes:
+            continue
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=engine)
+                created_indexes = True
+    
+    if created_indexes and IS_SQLITE:
+        # Refresh planner statistics so SQLite picks up the new indexes
+        with engine.begin() as connection:
+            connection.exec_driver_sql("ANALYZE")
+    
+    if not IS_SQLITE:
+        # Rollups and their triggers are SQLite SQL; other databases read sales directly
+        return
+    
+    with engine.begin() as connection:
+        if not ROLLUP_TABLES <= existing_tables:
+            # New rollup tables start empty; fill them from the existing sales
+            refresh_rollups(connection.connection)
+        else:
+            # Rebuild rollups left with an older layout
+            ensure_rollups(connection.connection)
 
 def get_db():
     """Dependency to get database session"""
@@ -40,10 +105,6 @@ def get_db():
     finally:
         db.close()
 
-def get_langchain_db():
-    """Get LangChain database instance"""
-    return langchain_db
-
 def get_sales_date_range() -> Tuple[Optional[datetime], Optional[datetime]]:
     """
     Get the actual date range of sales data from the database
@@ -74,6 +135,62 @@ def get_sales_date_range() -> Tuple[Optional[datetime], Optional[datetime]]:
         print(f"Error getting sales date range: {e}")
         return None, None
 
+def get_sales_data_version() -> Optional[tuple]:
+    """
+    Fingerprint of the sales table that changes when sales are inserted, deleted or edited
+    
+    One aggregate scan (row count, largest id, sums of the columns and the date
+    range) rather than a change log, so writes made by other processes, such as
+    setup_database.py, are noticed too. Edits whose differences cancel out in
+    every sum go unnoticed.
+    
+    Returns:
+        Tuple of aggregates, or None if the database could not be read
+    """
+    try:
+        # Import here to avoid circular imports
+        from app.models import Sale
+        
+        with SessionLocal() as session:
+            result = session.execute(
+                select(
+                    func.count(Sale.id), func.max(Sale.id),
+                    func.sum(Sale.product_id), func.sum(Sale.customer_id),
+                    func.sum(Sale.quantity), func.sum(Sale.total_amount),
+                    func.min(Sale.sale_date), func.max(Sale.sale_date)
+                )
+            ).first()
+            return tuple(result)
+            
+    except Exception as e:
+        # Log error but don't crash
+        print(f"Error getting sales data version: {e}")
+        return None
+
+# (timestamp, (min_date, max_date)) of the last successful date range lookup
+_date_range_cache: Optional[Tuple[float, Tuple[datetime, datetime]]] = None
+
+def _cached_sales_date_range(ttl: float = SALES_DATE_RANGE_CACHE_TTL) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Get the sales date range, re-querying the database at most once per ttl seconds
+    
+    Args:
+        ttl: Maximum age in seconds of a cached result
+        
+    Returns:
+        Tuple of (min_date, max_date) or (None, None) if no data
+    """
+    global _date_range_cache
+    now = time.monotonic()
+    if _date_range_cache is not None and now - _date_range_cache[0] <= ttl:
+        return _date_range_cache[1]
+    
+    min_date, max_date = get_sales_date_range()
+    if min_date is not None and max_date is not None:
+        # Only cache real data so an empty or failing database is re-checked
+        _date_range_cache = (now, (min_date, max_date))
+    return min_date, max_date
+
 def format_date_range_for_prompt(min_date: datetime, max_date: datetime) -> str:
     """
     Format date range for use in prompts
@@ -85,16 +202,18 @@ def format_date_range_for_prompt(min_date: datetime, max_date: datetime) -> str:
     Returns:
         Formatted string describing the data period
     """
-    # Map months to Portuguese
-    months_pt = {
-        1: 'janeiro', 2: 'fevereiro', 3: 'março', 4: 'abril',
-        5: 'maio', 6: 'junho', 7: 'julho', 8: 'agosto',
-        9: 'setembro', 10: 'outubro', 11: 'novembro', 12: 'dezembro'
-    }
+    # Memoized per pair of calendar days (ordinals hash cheaply and ignore the time of day)
+    return _format_date_range(min_date.toordinal(), max_date.toordinal())
+
+@lru_cache(maxsize=8)
+def _format_date_range(min_ordinal: int, max_ordinal: int) -> str:
+    """Format a date range given as day ordinals (see format_date_range_for_prompt)"""
+    min_date = date.fromordinal(min_ordinal)
+    max_date = date.fromordinal(max_ordinal)
     
     # Format dates
-    min_month = months_pt[min_date.month]
-    max_month = months_pt[max_date.month]
+    min_month = MONTHS_PT[min_date.month]
+    max_month = MONTHS_PT[max_date.month]
     
     if min_date.year == max_date.year:
         if min_date.month == max_date.month:
@@ -114,7 +233,7 @@ def get_sales_data_availability_info() -> str:
     Returns:
         Formatted string describing data availability
     """
-    min_date, max_date = get_sales_date_range()
+    min_date, max_date = _cached_sales_date_range()
     
     if min_date is None or max_date is None:
         return "Não há dados de vendas disponíveis no banco de dados."
@@ -3,55 +3,94 @@ FastAPI Sales Analysis API
 
 This API provides two main endpoints:
 1. GET /sales-insights?question={question} - Process natural language questions about sales data
+   (streamed as Server-Sent Events; GET /sales-insights/full returns a single JSON document)
 2. GET /top-products - Get the top 5 products sold in the last month
 """
-from fastapi import FastAPI, Depends, HTTPException, Query
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Dict, Any
+import hashlib
+import json
 import logging
 
 from app.database import get_db, create_db_and_tables
 from app.services import SalesService
-from app.ollama_mcp_service import get_ollama_mcp_service
+from app.ollama_mcp_service import get_ollama_mcp_service, close_ollama_mcp_service
 from app.constants import (
     API_TITLE, API_DESCRIPTION, API_VERSION,
     ERROR_QUESTION_EMPTY, ERROR_QUESTION_NOT_RELATED,
     DEFAULT_TOP_PRODUCTS_LIMIT, MIN_TOP_PRODUCTS_LIMIT, MAX_TOP_PRODUCTS_LIMIT,
-    OLLAMA_MODEL, MODEL_DESCRIPTION
+    OLLAMA_MODEL, MODEL_DESCRIPTION,
+    API_DATA_CACHE_CONTROL, API_STATIC_CACHE_CONTROL
 )
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize database and services on startup, release them on shutdown"""
+    logger.info(f"Starting up {API_TITLE} with {MODEL_DESCRIPTION}...")
+    
+    # Create database tables
+    create_db_and_tables()
+    logger.info("Database tables created")
+    
+    # Initialize the Ollama + MCP service once, before serving requests
+    try:
+        await get_ollama_mcp_service()
+    except Exception as e:
+        # Keep the API up; the service is initialized again on the first question
+        logger.warning(f"Ollama MCP service not initialized at startup: {e}")
+    
+    logger.info(f"API started successfully using {OLLAMA_MODEL}")
+    
+    yield
+    
+    await close_ollama_mcp_service()
+    logger.info("Ollama MCP service closed")
+
 # Create FastAPI app
 app = FastAPI(
     title=API_TITLE,
     description=API_DESCRIPTION,
     version=API_VERSION,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database and services on startup"""
-    logger.info(f"Starting up {API_TITLE} with {MODEL_DESCRIPTION}...")
+def _cacheable_json_response(request: Request, payload: Dict[str, Any], cache_control: str) -> Response:
+    """
+    Build a JSON response with Cache-Control and ETag headers.
     
-    # Create database tables
-    create_db_and_tables()
-    logger.info("Database tables created")
+    Returns 304 Not Modified without a body when the client's If-None-Match
+    already holds the current ETag.
+    """
+    response = JSONResponse(content=jsonable_encoder(payload))
+    etag = f'"{hashlib.md5(response.body).hexdigest()}"'
+    headers = {"Cache-Control": cache_control, "ETag": etag}
     
-    logger.info(f"API started successfully using {OLLAMA_MODEL}")
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
+    return response
 
 @app.get("/")
-async def root():
+async def root(request: Request) -> Response:
     """Root endpoint with API information"""
-    return {
+    return _cacheable_json_response(request, {
         "message": API_TITLE,
         "description": API_DESCRIPTION,
         "endpoints": {
-            "/sales-insights": "Process natural language questions about sales data",
+            "/sales-insights": "Process natural language questions about sales data (Server-Sent Events)",
+            "/sales-insights/full": "Process natural language questions about sales data (single JSON response)",
             "/top-products": "Get top 5 products sold in the last month",
             "/stats": "Get general sales statistics",
             "/docs": "API documentation (Swagger UI)",
@@ -59,7 +98,7 @@ async def root():
         },
         "version": API_VERSION,
         "model": MODEL_DESCRIPTION
-    }
+    }, API_STATIC_CACHE_CONTROL)
 
 @app.get("/health")
 async def health_check():
@@ -74,9 +113,50 @@ async def health_check():
     }
 
 @app.get("/sales-insights")
+async def stream_sales_insights(
+    question: str = Query(..., description="Natural language question about sales data")
+) -> StreamingResponse:
+    """
+    Process natural language questions about sales data, streaming the answer as it is generated.
+    
+    The response is a text/event-stream of Server-Sent Events:
+        - "token": {"content": ...} for each generated piece of text
+        - "tool": {"name": ...} whenever an MCP tool is called
+        - "done": the same JSON document returned by /sales-insights/full
+        - "error": the error document (e.g. for questions not related to sales)
+    
+    Args:
+        question: Natural language question about sales, products, customers, etc.
+    """
+    if not question.strip():
+        raise HTTPException(
+            status_code=400,
+            detail=ERROR_QUESTION_EMPTY
+        )
+    
+    try:
+        logger.info(f"Streaming question with {OLLAMA_MODEL}+MCP: {question}")
+        
+        # Get the Ollama MCP service
+        ollama_service = await get_ollama_mcp_service()
+        
+    except Exception as e:
+        logger.error(f"Error processing question: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+    
+    async def event_generator():
+        async for event in ollama_service.stream_sales_insight(question):
+            data = json.dumps(event["data"], ensure_ascii=False, default=str)
+            yield f"event: {event['event']}\ndata: {data}\n\n"
+    
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+@app.get("/sales-insights/full")
 async def get_sales_insights(
-    question: str = Query(..., description="Natural language question about sales data"),
-    db: Session = Depends(get_db)
+    question: str = Query(..., description="Natural language question about sales data")
 ) -> Dict[str, Any]:
     """
     Process natural language questions about sales data using Ollama + MCP.
@@ -129,8 +209,11 @@ async def get_sales_insights(
             detail=f"Internal server error: {str(e)}"
         )
 
+# Database endpoints are plain functions: FastAPI runs them in its threadpool,
+# so the blocking SQLAlchemy calls never stall the event loop serving LLM requests
 @app.get("/top-products")
-async def get_top_products(
+def get_top_products(
+    request: Request,
     limit: int = Query(
         DEFAULT_TOP_PRODUCTS_LIMIT, 
         ge=MIN_TOP_PRODUCTS_LIMIT, 
@@ -138,7 +221,7 @@ async def get_top_products(
         description="Number of top products to return"
     ),
     db: Session = Depends(get_db)
-) -> Dict[str, Any]:
+) -> Response:
     """
     Get top products by quantity sold in the last month.
     
@@ -153,12 +236,12 @@ async def get_top_products(
         sales_service = SalesService(db)
         products = sales_service.get_top_products_last_month(limit)
         
-        return {
+        return _cacheable_json_response(request, {
             "top_products": products,
             "limit": limit,
             "period": "Last 12 months",
             "total_found": len(products)
-        }
+        }, API_DATA_CACHE_CONTROL)
         
     except Exception as e:
         logger.error(f"Error getting top products: {e}")
@@ -168,7 +251,7 @@ async def get_top_products(
         )
 
 @app.get("/stats")
-async def get_sales_stats(db: Session = Depends(get_db)) -> Dict[str, Any]:
+def get_sales_stats(request: Request, db: Session = Depends(get_db)) -> Response:
     """
     Get general sales statistics.
     
@@ -180,10 +263,10 @@ async def get_sales_stats(db: Session = Depends(get_db)) -> Dict[str, Any]:
         sales_service = SalesService(db)
         stats = sales_service.get_sales_stats()
         
-        return {
+        return _cacheable_json_response(request, {
             "statistics": stats,
             "message": "Sales statistics retrieved successfully"
-        }
+        }, API_DATA_CACHE_CONTROL)
         
     except Exception as e:
         logger.error(f"Error getting sales stats: {e}")
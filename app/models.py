@@ -1,12 +1,17 @@
 """
 SQLAlchemy models based on the database schema
 """
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, ForeignKey, Index
+from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 from app.database import Base
 
+# Rollup tables are created and maintained by app.rollups (on SQLite only); their
+# mappings use separate metadata so create_all never creates them
+RollupBase = declarative_base()
+
 class Product(Base):
     __tablename__ = "products"
     
@@ -32,6 +37,14 @@ class Customer(Base):
 
 class Sale(Base):
     __tablename__ = "sales"
+    __table_args__ = (
+        # Covering index: per-product date-range aggregates are answered from
+        # the index alone, without visiting the table rows
+        Index("ix_sales_product_date", "product_id", "sale_date", "quantity", "total_amount"),
+        # Covering index for date-range aggregates (period summaries, min/max dates)
+        Index("ix_sales_date_amount", "sale_date", "total_amount", "quantity"),
+        Index("ix_sales_customer_id", "customer_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
@@ -42,4 +55,15 @@ class Sale(Base):
     
     # Relationships
     product = relationship("Product", back_populates="sales")
-    customer = relationship("Customer", back_populates="sales") 
\ No newline at end of file
+    customer = relationship("Customer", back_populates="sales")
+
+class ProductSalesDaily(RollupBase):
+    """Daily sales per product rollup, rebuilt by app.rollups.refresh_rollups"""
+    __tablename__ = "product_sales_daily"
+    
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    quantity = Column(Integer, nullable=False)
+    # Integer cents: exact sums; divide by 100 for display
+    revenue_cents = Column(Integer, nullable=False)
+    sales_count = Column(Integer, nullable=False)
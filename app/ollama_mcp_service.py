@@ -5,53 +5,59 @@ Uses local Ollama model with MCP to access database
 import asyncio
 import logging
 import datetime
-from typing import Dict, Any, Optional
-from langchain_ollama import ChatOllama
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.output_parsers import StrOutputParser
-from langchain_mcp_adapters.client import MultiServerMCPClient
-from langchain_core.tools import Tool
-from langgraph.prebuilt import create_react_agent
+import re
+from typing import AsyncIterator, Dict, Any, Optional
+from langchain_core.messages import AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
 
 from app.constants import (
-    OLLAMA_MODEL, OLLAMA_BASE_URL, OLLAMA_TEMPERATURE,
+    OLLAMA_MODEL, OLLAMA_BASE_URL, OLLAMA_TEMPERATURE, LLM_CACHE_DATABASE_PATH,
+    OLLAMA_EMBEDDING_MODEL, OLLAMA_KEEP_ALIVE, OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
     MCP_SERVER_URL, MCP_TRANSPORT,
-    SALES_KEYWORDS, ERROR_QUESTION_NOT_SALES_RELATED,
+    SALES_KEYWORDS_SET, ERROR_QUESTION_NOT_SALES_RELATED,
     ERROR_QUESTION_NOT_RELATED, ERROR_PROCESSING_QUESTION,
-    MODEL_DISPLAY_NAME
+    MODEL_DISPLAY_NAME, MONTHS_PT
 )
-from app.database import get_sales_data_availability_info
+from app.database import get_sales_data_availability_info, get_sales_data_version
+from app.semantic_cache import SemanticResponseCache
 
 logger = logging.getLogger(__name__)
 
+# Questions are tokenized once and matched against the keyword set
+WORD_RE = re.compile(r"\w+")
+
+# Static instructions form a stable prompt prefix; only the short context
+# message built per invocation carries the current date.
+STATIC_SYSTEM_PROMPT = """Você é um especialista em análise de dados de vendas.
+
+INSTRUÇÕES:
+1. Responda sempre em português brasileiro
+2. Use as ferramentas MCP disponíveis para consultar o banco de dados
+3. Seja preciso com datas e períodos ao fazer consultas SQL
+4. Se os dados não cobrirem o período solicitado, explique claramente a limitação
+5. Ao fazer consultas SQL com datas, use o formato YYYY-MM-DD para compatibilidade
+6. Para consultas de "hoje", use a data atual como referência e verifique se há dados para esse período
+7. Quando o usuário mencionar "hoje", "esta semana", "este mês" ou "período recente", use a data atual informada no contexto como referência
+
+EXEMPLOS DE CONSULTAS TEMPORAIS:
+- Para "esta semana": WHERE sale_date >= date('now', 'weekday 0', '-7 days')
+
+Responda de forma clara e objetiva."""
+
 def _get_current_datetime() -> str:
     """Get current date and time formatted for the prompt"""
     now = datetime.datetime.now()
     return now.strftime("%Y-%m-%d %H:%M:%S")
 
+# Portuguese date string for the current day, rebuilt only when the day rolls over
+_CURRENT_DATE_CACHE = {"day": None, "str": ""}
+
 def _get_current_date() -> str:
     """Get current date formatted for the prompt"""
-    import locale
-    try:
-        # Tentar definir locale para português
-        locale.setlocale(locale.LC_TIME, 'pt_BR.UTF-8')
-    except:
-        # Fallback se não conseguir definir locale
-        pass
-    
-    today = datetime.datetime.now()
-    # Mapear meses manualmente para garantir português
-    months_pt = {
-        1: 'janeiro', 2: 'fevereiro', 3: 'março', 4: 'abril',
-        5: 'maio', 6: 'junho', 7: 'julho', 8: 'agosto',
-        9: 'setembro', 10: 'outubro', 11: 'novembro', 12: 'dezembro'
-    }
-    
-    day = today.day
-    month = months_pt[today.month]
-    year = today.year
-    
-    return f"{day} de {month} de {year}"
+    today = datetime.date.today()
+    if _CURRENT_DATE_CACHE["day"] != today:
+        _CURRENT_DATE_CACHE["str"] = f"{today.day} de {MONTHS_PT[today.month]} de {today.year}"
+        _CURRENT_DATE_CACHE["day"] = today
+    return _CURRENT_DATE_CACHE["str"]
 
 class OllamaMCPSalesService:
     """Service for generating sales insights using Ollama + MCP"""
@@ -61,54 +67,56 @@ class OllamaMCPSalesService:
         self.mcp_client = None
         self.agent = None
         self._initialized = False
-        self.system_prompt_template = None
+        self._system_message = SystemMessage(content=STATIC_SYSTEM_PROMPT)
+        self._tools = []
+        self._tool_names = []
+        self.semantic_cache = None
     
-    def _create_system_prompt_with_date(self) -> str:
-        """Create system prompt with current date and dynamic data availability info"""
-        current_date = _get_current_date()
-        current_datetime = _get_current_datetime()
-        
-        # Get dynamic data availability info using SQLAlchemy
-        data_availability = get_sales_data_availability_info()
+    async def _data_availability(self) -> str:
+        """Sales data availability text, read once per request in a worker thread (it queries the database)"""
+        return await asyncio.to_thread(get_sales_data_availability_info)
+    
+    def _create_context_prompt(self, data_availability: str) -> str:
+        """Create the short per-invocation context with the current date and data availability"""
+        today = datetime.date.today()
         
-        system_prompt = f"""Você é um especialista em análise de dados de vendas.
-
-CONTEXTO TEMPORAL:
-- Data atual: {current_date}
-- Data/hora atual: {current_datetime}
-- Quando o usuário mencionar "hoje", "esta semana", "este mês" ou "período recente", use a data atual como referência.
+        return f"""CONTEXTO TEMPORAL:
+- Data atual: {_get_current_date()}
+- Para "hoje": WHERE date(sale_date) = '{today:%Y-%m-%d}'
+- Para "este mês": WHERE strftime('%Y-%m', sale_date) = '{today:%Y-%m}'
 
 DADOS DISPONÍVEIS:
-{data_availability}
-
-INSTRUÇÕES:
-1. Responda sempre em português brasileiro
-2. Use as ferramentas MCP disponíveis para consultar o banco de dados
-3. Seja preciso com datas e períodos ao fazer consultas SQL
-4. Se os dados não cobrirem o período solicitado, explique claramente a limitação
-5. Ao fazer consultas SQL com datas, use o formato YYYY-MM-DD para compatibilidade
-6. Para consultas de "hoje", use a data atual como referência e verifique se há dados para esse período
-
-EXEMPLOS DE CONSULTAS TEMPORAIS:
-- Para "hoje": WHERE date(sale_date) = '{datetime.datetime.now().strftime('%Y-%m-%d')}'
-- Para "esta semana": WHERE sale_date >= date('now', 'weekday 0', '-7 days')
-- Para "este mês": WHERE strftime('%Y-%m', sale_date) = '{datetime.datetime.now().strftime('%Y-%m')}'
-
-Responda de forma clara e objetiva."""
-
-        return system_prompt
+{data_availability}"""
 
     async def initialize(self):
         """Initialize the Ollama model and MCP client"""
         if self._initialized:
             return
         
+        # Heavy client libraries are imported here so importing the app
+        # (and serving the database endpoints) only loads FastAPI + SQLAlchemy
+        import httpx
+        from langchain_community.cache import SQLiteCache
+        from langchain_core.globals import set_llm_cache
+        from langchain_mcp_adapters.client import MultiServerMCPClient
+        from langchain_ollama import ChatOllama, OllamaEmbeddings
+        
         try:
-            # Initialize Ollama chat model
+            # Cache LLM responses so identical prompts skip Ollama entirely
+            set_llm_cache(SQLiteCache(database_path=LLM_CACHE_DATABASE_PATH))
+            
+            # HTTP connections to Ollama are kept open and reused across requests
+            ollama_client_kwargs = {
+                "limits": httpx.Limits(max_keepalive_connections=OLLAMA_MAX_KEEPALIVE_CONNECTIONS)
+            }
+            
+            # Initialize Ollama chat model (a single client for the whole service lifetime)
             self.llm = ChatOllama(
                 model=OLLAMA_MODEL,
                 temperature=OLLAMA_TEMPERATURE,
-                base_url=OLLAMA_BASE_URL
+                base_url=OLLAMA_BASE_URL,
+                keep_alive=OLLAMA_KEEP_ALIVE,
+                client_kwargs=ollama_client_kwargs
             )
             
             # Test Ollama connection
@@ -116,13 +124,18 @@ Responda de forma clara e objetiva."""
                 test_response = await self._test_ollama_connection()
                 logger.info(f"Ollama connection successful with {OLLAMA_MODEL}: {test_response[:100]}...")
             except Exception as e:
+                # Keep the same client; transient failures are retried on the next request
                 logger.warning(f"Ollama connection test failed: {e}")
-                # Try using the same model (since it's configured in constants)
-                self.llm = ChatOllama(
-                    model=OLLAMA_MODEL,
-                    temperature=OLLAMA_TEMPERATURE,
-                    base_url=OLLAMA_BASE_URL
+            
+            # Reuse answers for paraphrased questions
+            self.semantic_cache = SemanticResponseCache(
+                OllamaEmbeddings(
+                    model=OLLAMA_EMBEDDING_MODEL,
+                    base_url=OLLAMA_BASE_URL,
+                    keep_alive=OLLAMA_KEEP_ALIVE,
+                    client_kwargs=ollama_client_kwargs
                 )
+            )
             
             # Initialize MCP client
             self.mcp_client = MultiServerMCPClient({
@@ -132,21 +145,8 @@ Responda de forma clara e objetiva."""
                 }
             })
             
-            # Get tools from MCP server
-            tools = await self.mcp_client.get_tools()
-            logger.info(f"Loaded {len(tools)} MCP tools")
-            
-            # Create custom prompt template with current date
-            system_prompt = self._create_system_prompt_with_date()
-            
-            # Create custom ChatPromptTemplate with date context
-            prompt_template = ChatPromptTemplate.from_messages([
-                ("system", system_prompt),
-                ("placeholder", "{messages}"),
-            ])
-            
-            # Create agent with tools and custom prompt
-            self.agent = create_react_agent(self.llm, tools, prompt=prompt_template)
+            # Load tools once and create the agent with them
+            await self.refresh_tools()
             
             self._initialized = True
             logger.info(f"OllamaMCPSalesService initialized successfully with {OLLAMA_MODEL} and date context")
@@ -155,6 +155,19 @@ Responda de forma clara e objetiva."""
             logger.error(f"Failed to initialize OllamaMCPSalesService: {e}")
             raise
     
+    async def refresh_tools(self):
+        """Reload the tool list from the MCP server and rebuild the agent with it"""
+        from langgraph.prebuilt import create_react_agent
+        
+        tools = await self.mcp_client.get_tools()
+        logger.info(f"Loaded {len(tools)} MCP tools")
+        
+        self._tools = tools
+        self._tool_names = [tool.name for tool in tools]
+        
+        # Create agent with tools; the system prompt is sent with each question's messages
+        self.agent = create_react_agent(self.llm, tools)
+    
     async def _test_ollama_connection(self) -> str:
         """Test connection to Ollama"""
         response = await self.llm.ainvoke("Hello")
@@ -162,8 +175,65 @@ Responda de forma clara e objetiva."""
     
     def _validate_question(self, question: str) -> bool:
         """Validate if question is related to sales data"""
-        question_lower = question.lower()
-        return any(keyword in question_lower for keyword in SALES_KEYWORDS)
+        # Plural forms are already in the keyword set, so no per-token normalization is needed
+        return not SALES_KEYWORDS_SET.isdisjoint(WORD_RE.findall(question.lower()))
+    
+    def _agent_input(self, question: str, data_availability: str) -> Dict[str, Any]:
+        """Build the agent input for a question"""
+        # Pre-built static system message first so the prompt prefix stays identical
+        # across calls, followed by the current date context
+        return {
+            "messages": [
+                self._system_message,
+                SystemMessage(content=self._create_context_prompt(data_availability)),
+                HumanMessage(content=question)
+            ]
+        }
+    
+    def _not_related_response(self, question: str, data_availability: str) -> Dict[str, Any]:
+        """Response for questions that are not about sales data"""
+        return {
+            "answer": ERROR_QUESTION_NOT_SALES_RELATED,
+            "question": question,
+            "mcp_tools_used": [],
+            "error": ERROR_QUESTION_NOT_RELATED,
+            "context_date": _get_current_date(),
+            "data_availability": data_availability
+        }
+    
+    def _success_response(self, question: str, answer: str, data_availability: str) -> Dict[str, Any]:
+        """Response carrying the agent's answer and metadata"""
+        return {
+            "answer": answer,
+            "question": question,
+            "mcp_tools_used": list(self._tool_names),
+            "error": None,
+            "model_used": MODEL_DISPLAY_NAME,
+            "context_date": _get_current_date(),
+            "context_datetime": _get_current_datetime(),
+            "data_availability": data_availability
+        }
+    
+    def _cached_response(self, question: str, cached: Dict[str, Any], data_availability: str) -> Dict[str, Any]:
+        """Response reusing a semantically cached answer for a new question"""
+        return {
+            **cached,
+            "question": question,
+            "context_date": _get_current_date(),
+            "context_datetime": _get_current_datetime(),
+            "data_availability": data_availability
+        }
+    
+    def _error_response(self, question: str, error: Exception, data_availability: str) -> Dict[str, Any]:
+        """Response for errors raised while processing a question"""
+        return {
+            "answer": ERROR_PROCESSING_QUESTION.format(error=str(error)),
+            "question": question,
+            "mcp_tools_used": [],
+            "error": str(error),
+            "context_date": _get_current_date(),
+            "data_availability": data_availability
+        }
     
     async def get_sales_insight(self, question: str) -> Dict[str, Any]:
         """
@@ -175,28 +245,29 @@ Responda de forma clara e objetiva."""
         Returns:
             Dictionary with the answer and metadata
         """
+        data_availability = None
         try:
+            # Read once per request and shared by the prompt and the response
+            data_availability = await self._data_availability()
+            
             # Ensure service is initialized
             await self.initialize()
             
             # Validate question is related to sales
             if not self._validate_question(question):
-                return {
-                    "answer": ERROR_QUESTION_NOT_SALES_RELATED,
-                    "question": question,
-                    "mcp_tools_used": [],
-                    "error": ERROR_QUESTION_NOT_RELATED,
-                    "context_date": _get_current_date(),
-                    "data_availability": get_sales_data_availability_info()
-                }
+                return self._not_related_response(question, data_availability)
+            
+            # Answer paraphrases of earlier questions without running the agent, as long
+            # as the sales data has not changed since (the version query scans sales)
+            data_version = await asyncio.to_thread(get_sales_data_version)
+            cached, cache_key = await self.semantic_cache.lookup(question, data_version)
+            if cached is not None:
+                return self._cached_response(question, cached, data_availability)
             
             # Use the agent to process the question
             logger.info(f"Processing question with {OLLAMA_MODEL}+MCP and date context: {question}")
             
-            # Invoke the agent with current date context
-            result = await self.agent.ainvoke({
-                "messages": [("human", question)]
-            })
+            result = await self.agent.ainvoke(self._agent_input(question, data_availability))
             
             # Extract the answer from the agent's response
             if "messages" in result and result["messages"]:
@@ -205,36 +276,78 @@ Responda de forma clara e objetiva."""
             else:
                 answer = "Não consegui processar sua pergunta adequadamente."
             
-            # Get tools safely
-            mcp_tools = []
-            if self.mcp_client:
-                try:
-                    tools = await self.mcp_client.get_tools()
-                    mcp_tools = [tool.name for tool in tools]
-                except Exception as e:
-                    logger.warning(f"Could not get MCP tools: {e}")
+            response = self._success_response(question, answer, data_availability)
+            self.semantic_cache.store(cache_key, response)
             
-            return {
-                "answer": answer,
-                "question": question,
-                "mcp_tools_used": mcp_tools,
-                "error": None,
-                "model_used": MODEL_DISPLAY_NAME,
-                "context_date": _get_current_date(),
-                "context_datetime": _get_current_datetime(),
-                "data_availability": get_sales_data_availability_info()
-            }
+            return response
             
         except Exception as e:
             logger.error(f"Error processing question: {e}")
-            return {
-                "answer": ERROR_PROCESSING_QUESTION.format(error=str(e)),
-                "question": question,
-                "mcp_tools_used": [],
-                "error": str(e),
-                "context_date": _get_current_date(),
-                "data_availability": get_sales_data_availability_info()
-            }
+            if data_availability is None:
+                data_availability = await self._data_availability()
+            return self._error_response(question, e, data_availability)
+    
+    async def stream_sales_insight(self, question: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a natural language question, yielding events while the agent runs.
+        
+        Args:
+            question: Natural language question about sales
+            
+        Yields:
+            Dictionaries with an "event" name and its "data":
+                - "token": {"content": ...} for each generated piece of text
+                - "tool": {"name": ...} whenever the agent calls an MCP tool
+                - "done": the same dictionary get_sales_insight returns
+                - "error": the error dictionary get_sales_insight returns
+        """
+        data_availability = None
+        try:
+            # Read once per request and shared by the prompt and the response
+            data_availability = await self._data_availability()
+            
+            # Ensure service is initialized
+            await self.initialize()
+            
+            # Validate question is related to sales
+            if not self._validate_question(question):
+                yield {"event": "error", "data": self._not_related_response(question, data_availability)}
+                return
+            
+            # Answer paraphrases of earlier questions without running the agent, as long
+            # as the sales data has not changed since (the version query scans sales)
+            data_version = await asyncio.to_thread(get_sales_data_version)
+            cached, cache_key = await self.semantic_cache.lookup(question, data_version)
+            if cached is not None:
+                response = self._cached_response(question, cached, data_availability)
+                yield {"event": "token", "data": {"content": response["answer"]}}
+                yield {"event": "done", "data": response}
+                return
+            
+            logger.info(f"Streaming question with {OLLAMA_MODEL}+MCP and date context: {question}")
+            
+            # Text of the current agent step; the last step holds the final answer
+            answer_parts = []
+            async for message, _ in self.agent.astream(self._agent_input(question, data_availability), stream_mode="messages"):
+                if isinstance(message, ToolMessage):
+                    # A tool ran, so the text generated so far was not the final answer
+                    answer_parts = []
+                    yield {"event": "tool", "data": {"name": message.name}}
+                elif isinstance(message, AIMessageChunk) and message.content:
+                    answer_parts.append(message.content)
+                    yield {"event": "token", "data": {"content": message.content}}
+            
+            answer = "".join(answer_parts) or "Não consegui processar sua pergunta adequadamente."
+            response = self._success_response(question, answer, data_availability)
+            self.semantic_cache.store(cache_key, response)
+            
+            yield {"event": "done", "data": response}
+            
+        except Exception as e:
+            logger.error(f"Error streaming question: {e}")
+            if data_availability is None:
+                data_availability = await self._data_availability()
+            yield {"event": "error", "data": self._error_response(question, e, data_availability)}
     
     async def close(self):
         """Close connections"""
@@ -246,11 +359,24 @@ Responda de forma clara e objetiva."""
 
 # Global instance
 _service_instance: Optional[OllamaMCPSalesService] = None
+_init_lock = asyncio.Lock()
 
 async def get_ollama_mcp_service() -> OllamaMCPSalesService:
     """Get or create the global service instance"""
     global _service_instance
     if _service_instance is None:
-        _service_instance = OllamaMCPSalesService()
-        await _service_instance.initialize()
-    return _service_instance 
\ No newline at end of file
+        async with _init_lock:
+            # Re-check: another coroutine may have finished initializing while we waited
+            if _service_instance is None:
+                service = OllamaMCPSalesService()
+                await service.initialize()
+                _service_instance = service
+    return _service_instance
+
+async def close_ollama_mcp_service():
+    """Close the global service instance, if it was created"""
+    global _service_instance
+    async with _init_lock:
+        if _service_instance is not None:
+            await _service_instance.close()
+            _service_instance = None
@@ -0,0 +1,196 @@
+"""
+Pre-aggregated rollup tables derived from the sales table
+
+Rollups are plain tables refreshed after data is loaded, so analytical tools
+read a handful of pre-grouped rows instead of scanning every sale.
+Functions take a DB-API connection (sqlite3 or SQLAlchemy's raw connection)
+and leave committing to the caller.
+
+Money is stored as integer cents: sums are exact and SQLite adds integers
+instead of doubles. Readers divide by 100 only when formatting.
+"""
+from typing import Any, Dict, FrozenSet, List, Set, Tuple
+
+# Sales aggregated per month (used by analyze_sales_trends)
+MONTHLY_SALES_ROLLUP_DDL = """
+CREATE TABLE IF NOT EXISTS monthly_sales_rollup (
+    month TEXT PRIMARY KEY,
+    orders INTEGER NOT NULL,
+    revenue_cents INTEGER NOT NULL
+)
+"""
+
+MONTHLY_SALES_ROLLUP_POPULATE = """
+INSERT INTO monthly_sales_rollup (month, orders, revenue_cents)
+SELECT
+    strftime('%Y-%m', sale_date) AS month,
+    COUNT(*) AS orders,
+    SUM(CAST(ROUND(total_amount * 100) AS INTEGER)) AS revenue_cents
+FROM sales
+GROUP BY 1
+"""
+
+# Daily sales per product (used by SalesService.get_top_products_last_month,
+# which looks up product names and prices in memory)
+PRODUCT_SALES_DAILY_DDL = """
+CREATE TABLE IF NOT EXISTS product_sales_daily (
+    day DATE NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    revenue_cents INTEGER NOT NULL,
+    sales_count INTEGER NOT NULL,
+    PRIMARY KEY (day, product_id)
+)
+"""
+
+PRODUCT_SALES_DAILY_POPULATE = """
+INSERT INTO product_sales_daily (day, product_id, quantity, revenue_cents, sales_count)
+SELECT
+    date(sale_date) AS day,
+    product_id,
+    SUM(quantity) AS quantity,
+    SUM(CAST(ROUND(total_amount * 100) AS INTEGER)) AS revenue_cents,
+    COUNT(*) AS sales_count
+FROM sales
+GROUP BY 1, 2
+"""
+
+# (table name, DDL, populate statement, columns of the current layout)
+ROLLUPS: List[Tuple[str, str, str, FrozenSet[str]]] = [
+    (
+        "monthly_sales_rollup", MONTHLY_SALES_ROLLUP_DDL, MONTHLY_SALES_ROLLUP_POPULATE,
+        frozenset({"month", "orders", "revenue_cents"})
+    ),
+    (
+        "product_sales_daily", PRODUCT_SALES_DAILY_DDL, PRODUCT_SALES_DAILY_POPULATE,
+        frozenset({"day", "product_id", "quantity", "revenue_cents", "sales_count"})
+    ),
+]
+
+ROLLUP_TABLES = frozenset(table_name for table_name, _, _, _ in ROLLUPS)
+
+# Incremental maintenance: each inserted, deleted or updated sale adjusts only its
+# month and its day/product, so the rollups stay current without refresh_rollups.
+# {row} is NEW or OLD inside the trigger
+_ADD_SALE_STATEMENTS = (
+    """
+    INSERT INTO monthly_sales_rollup (month, orders, revenue_cents)
+    VALUES (strftime('%Y-%m', {row}.sale_date), 1, CAST(ROUND({row}.total_amount * 100) AS INTEGER))
+    ON CONFLICT (month) DO UPDATE SET
+        orders = orders + excluded.orders,
+        revenue_cents = revenue_cents + excluded.revenue_cents;
+    """,
+    """
+    INSERT INTO product_sales_daily (day, product_id, quantity, revenue_cents, sales_count)
+    VALUES (date({row}.sale_date), {row}.product_id, {row}.quantity,
+        CAST(ROUND({row}.total_amount * 100) AS INTEGER), 1)
+    ON CONFLICT (day, product_id) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        revenue_cents = revenue_cents + excluded.revenue_cents,
+        sales_count = sales_count + excluded.sales_count;
+    """,
+)
+_REMOVE_SALE_STATEMENTS = (
+    """
+    UPDATE monthly_sales_rollup SET
+        orders = orders - 1,
+        revenue_cents = revenue_cents - CAST(ROUND({row}.total_amount * 100) AS INTEGER)
+    WHERE month = strftime('%Y-%m', {row}.sale_date);
+    DELETE FROM monthly_sales_rollup
+    WHERE month = strftime('%Y-%m', {row}.sale_date) AND orders <= 0;
+    """,
+    """
+    UPDATE product_sales_daily SET
+        quantity = quantity - {row}.quantity,
+        revenue_cents = revenue_cents - CAST(ROUND({row}.total_amount * 100) AS INTEGER),
+        sales_count = sales_count - 1
+    WHERE day = date({row}.sale_date) AND product_id = {row}.product_id;
+    DELETE FROM product_sales_daily
+    WHERE day = date({row}.sale_date) AND product_id = {row}.product_id AND sales_count <= 0;
+    """,
+)
+
+def _sale_statements(statements: Tuple[str, ...], row: str) -> str:
+    """Trigger body statements applied to the NEW or OLD sale row"""
+    return "".join(statement.format(row=row) for statement in statements)
+
+# (trigger name, DDL) of the triggers on sales that keep every rollup current
+ROLLUP_TRIGGERS: List[Tuple[str, str]] = [
+    (
+        "trg_sales_rollups_insert",
+        "CREATE TRIGGER trg_sales_rollups_insert AFTER INSERT ON sales BEGIN"
+        + _sale_statements(_ADD_SALE_STATEMENTS, "NEW") + "END"
+    ),
+    (
+        "trg_sales_rollups_delete",
+        "CREATE TRIGGER trg_sales_rollups_delete AFTER DELETE ON sales BEGIN"
+        + _sale_statements(_REMOVE_SALE_STATEMENTS, "OLD") + "END"
+    ),
+    (
+        "trg_sales_rollups_update",
+        "CREATE TRIGGER trg_sales_rollups_update "
+        "AFTER UPDATE OF product_id, quantity, total_amount, sale_date ON sales BEGIN"
+        + _sale_statements(_REMOVE_SALE_STATEMENTS, "OLD")
+        + _sale_statements(_ADD_SALE_STATEMENTS, "NEW") + "END"
+    ),
+]
+
+def _create_triggers(cursor: Any):
+    """(Re)create the rollup triggers, so their bodies always match ROLLUP_TRIGGERS"""
+    for trigger_name, ddl in ROLLUP_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+        cursor.execute(ddl)
+
+def refresh_rollups(conn: Any):
+    """
+    Rebuild every rollup table from the current sales data
+
+    Call after bulk loads into sales, inside the same transaction; the triggers
+    created here keep the rollups current for row-by-row writes afterwards.
+
+    Args:
+        conn: DB-API connection to the sales database
+    """
+    cursor = conn.cursor()
+    for table_name, ddl, populate, _ in ROLLUPS:
+        # Dropped rather than emptied, so tables with an older layout are recreated too
+        cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+        cursor.execute(ddl)
+        cursor.execute(populate)
+    _create_triggers(cursor)
+    cursor.close()
+
+def ensure_rollups(conn: Any) -> bool:
+    """
+    Create and populate rollup tables that do not exist yet or have an older layout,
+    plus any missing rollup trigger
+
+    Args:
+        conn: DB-API connection to the sales database
+
+    Returns:
+        True if any rollup or trigger had to be built
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT m.name, p.name FROM sqlite_master m JOIN pragma_table_info(m.name) p "
+        "WHERE m.type = 'table'"
+    )
+    existing_columns: Dict[str, Set[str]] = {}
+    for table_name, column_name in cursor.fetchall():
+        existing_columns.setdefault(table_name, set()).add(column_name)
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    existing_triggers = {row[0] for row in cursor.fetchall()}
+
+    built = False
+    for table_name, ddl, populate, columns in ROLLUPS:
+        if existing_columns.get(table_name) != columns:
+            cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+            cursor.execute(ddl)
+            cursor.execute(populate)
+            built = True
+    if built or not all(trigger_name in existing_triggers for trigger_name, _ in ROLLUP_TRIGGERS):
+        _create_triggers(cursor)
+        built = True
+    cursor.close()
+    return built
@@ -0,0 +1,66 @@
+"""
+Dados iniciais do banco (os mesmos do script_dump_banco.txt)
+
+Compartilhados por setup_clean_database.py e setup_database.py. As vendas
+ficam em colunas paralelas (uma sequência tipada por coluna) em vez de uma
+tupla por linha: cada coluna numérica é um único buffer contíguo e a carga
+é um executemany sobre zip(*SALES_COLUMNS).
+"""
+from array import array
+
+PRODUCTS_INSERT = "INSERT INTO products (sku, name, category, price) VALUES (?, ?, ?, ?)"
+PRODUCTS_DATA = [
+    ('SKU001', 'Product A', 'Category 1', 10.99),
+    ('SKU002', 'Product B', 'Category 1', 20.50),
+    ('SKU003', 'Product C', 'Category 2', 15.75),
+    ('SKU004', 'Product D', 'Category 3', 30.00),
+    ('SKU005', 'Product E', 'Category 4', 25.00)
+]
+
+CUSTOMERS_INSERT = "INSERT INTO customers (name, email) VALUES (?, ?)"
+CUSTOMERS_DATA = [
+    ('John Doe', 'john@example.com'),
+    ('Jane Smith', 'jane@example.com'),
+    ('Bob Johnson', 'bob@example.com'),
+    ('Alice Brown', 'alice@example.com'),
+    ('Charlie Davis', 'charlie@example.com')
+]
+
+SALES_INSERT = (
+    "INSERT INTO sales (product_id, customer_id, quantity, total_amount, sale_date) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+# Uma entrada por venda em cada coluna, na mesma ordem
+SALES_PRODUCT_IDS = array('l', [
+    4, 5, 5, 1, 2, 3, 4, 5, 1, 2, 3, 4, 5, 1, 2, 3, 4,
+    5, 1, 2, 3, 4, 5, 1, 2, 3, 4, 5, 1, 2, 3, 4, 5
+])
+SALES_CUSTOMER_IDS = array('l', [
+    1, 1, 4, 2, 3, 5, 2, 4, 3, 5, 1, 4, 2, 5, 4, 2, 5,
+    1, 4, 3, 5, 2, 3, 1, 4, 2, 5, 4, 2, 1, 3, 5, 2
+])
+SALES_QUANTITIES = array('l', [
+    4, 7, 4, 2, 1, 3, 1, 5, 2, 6, 2, 1, 3, 2, 4, 1, 2,
+    8, 3, 2, 4, 1, 2, 6, 2, 3, 2, 1, 7, 4, 5, 3, 9
+])
+SALES_TOTAL_AMOUNTS = array('d', [
+    120.00, 175.00, 100.00, 21.98, 20.50, 47.25, 30.00, 125.00, 21.98, 123.00, 31.50,
+    30.00, 75.00, 21.98, 82.00, 15.75, 60.00, 200.00, 32.97, 41.00, 63.00, 30.00,
+    50.00, 65.94, 41.00, 47.25, 60.00, 25.00, 76.93, 82.00, 78.75, 90.00, 225.00
+])
+SALES_DATES = (
+    '2025-01-17 12:22:49', '2025-01-28 04:04:17', '2025-02-04 11:58:16', '2025-01-05 10:30:45',
+    '2025-01-06 15:15:10', '2025-01-08 09:45:22', '2025-01-10 17:22:30', '2025-01-12 11:00:00',
+    '2025-01-14 18:25:45', '2025-01-15 13:12:22', '2025-01-18 08:10:33', '2025-01-20 14:05:20',
+    '2025-01-23 19:30:40', '2025-01-25 10:45:10', '2025-01-29 16:20:50', '2025-02-01 12:00:00',
+    '2025-02-03 18:40:30', '2025-02-05 11:25:00', '2025-02-07 14:50:10', '2025-02-08 10:20:15',
+    '2025-02-10 16:45:55', '2025-02-12 20:30:00', '2025-02-15 09:10:10', '2025-02-16 13:35:30',
+    '2025-02-18 15:00:00', '2025-02-19 11:30:45', '2025-02-21 14:10:22', '2025-02-22 19:45:55',
+    '2025-02-24 12:10:10', '2025-02-25 17:30:50', '2025-02-27 09:55:00', '2025-02-28 14:25:30',
+    '2025-03-02 10:00:00'
+)
+# Na ordem das colunas de SALES_INSERT
+SALES_COLUMNS = (
+    SALES_PRODUCT_IDS, SALES_CUSTOMER_IDS, SALES_QUANTITIES, SALES_TOTAL_AMOUNTS, SALES_DATES
+)
+SALES_COUNT = len(SALES_DATES)
@@ -0,0 +1,178 @@
+"""
+Semantic response cache for natural language questions about sales data
+Reuses a previous answer when a new question is a close paraphrase of an earlier one
+"""
+import datetime
+import logging
+import math
+import re
+import time
+import unicodedata
+from typing import Any, Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from app.constants import (
+    SEMANTIC_CACHE_SIMILARITY_THRESHOLD, SEMANTIC_CACHE_TTL_SECONDS,
+    SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_RETRY_SECONDS,
+    SEMANTIC_CACHE_PERIOD_WORDS, MONTHS_PT
+)
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r"\w+")
+
+def _strip_accents(text: str) -> str:
+    """Text without diacritics (março -> marco)"""
+    return "".join(
+        char for char in unicodedata.normalize("NFKD", text)
+        if not unicodedata.combining(char)
+    )
+
+_PERIOD_WORDS = SEMANTIC_CACHE_PERIOD_WORDS | {_strip_accents(month) for month in MONTHS_PT.values()}
+
+def question_specifics(question: str) -> FrozenSet[str]:
+    """
+    Words of a question that change which data it asks about
+    
+    Numbers (days, years, quantities, SKUs), month names and relative periods.
+    Embeddings of "vendas de janeiro" and "vendas de fevereiro" are nearly
+    identical, so a cached answer is only reused when these words match exactly.
+    
+    Args:
+        question: Natural language question about sales
+        
+    Returns:
+        Set of normalized (lowercase, unaccented) words
+    """
+    words = WORD_RE.findall(_strip_accents(question.lower()))
+    return frozenset(
+        word for word in words
+        if word in _PERIOD_WORDS or any(char.isdigit() for char in word)
+    )
+
+class SemanticResponseCache:
+    """
+    In-process cache of responses keyed by the embedding of the question
+    
+    Entries belong to one version of the sales data (see get_sales_data_version)
+    and are all dropped as soon as a lookup sees a different version.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        threshold: float = SEMANTIC_CACHE_SIMILARITY_THRESHOLD,
+        ttl: float = SEMANTIC_CACHE_TTL_SECONDS,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        retry_seconds: float = SEMANTIC_CACHE_RETRY_SECONDS
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.retry_seconds = retry_seconds
+        # Embeddings are skipped until this monotonic time after a failure
+        self._retry_at = 0.0
+        self._data_version: Optional[Hashable] = None
+        # (created_at, day ordinal, question specifics, unit vector, response)
+        self._entries: List[Tuple[float, int, FrozenSet[str], List[float], Dict[str, Any]]] = []
+
+    async def _embed(self, question: str) -> Optional[List[float]]:
+        """Embed a question as a unit vector, or None while embeddings are failing"""
+        now = time.monotonic()
+        if now < self._retry_at:
+            return None
+
+        try:
+            vector = await self.embeddings.aembed_query(question)
+        except Exception as e:
+            # A transient failure only skips the cache for a while
+            logger.warning(f"Semantic cache skipped for {self.retry_seconds}s, could not embed question: {e}")
+            self._retry_at = now + self.retry_seconds
+            return None
+
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def _evict_expired(self, now: float, today: int):
+        """Drop entries older than the TTL or created on another day"""
+        # Answers to "hoje"/"este mês" questions are only valid for the day they were produced
+        self._entries = [
+            entry for entry in self._entries
+            if now - entry[0] <= self.ttl and entry[1] == today
+        ]
+
+    def _check_data_version(self, data_version: Hashable):
+        """Drop all entries if the sales data changed since they were stored"""
+        if data_version != self._data_version:
+            if self._entries:
+                logger.info("Sales data changed, clearing the semantic cache")
+                self._entries.clear()
+            self._data_version = data_version
+
+    async def lookup(
+        self, question: str, data_version: Optional[Hashable]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[tuple]]:
+        """
+        Find a cached response for a semantically similar question
+
+        Args:
+            question: Natural language question about sales
+            data_version: Current sales data version; None (unknown) bypasses the cache
+
+        Returns:
+            Tuple of (cached response or None, key to pass to store() or None)
+        """
+        if data_version is None:
+            return None, None
+        self._check_data_version(data_version)
+
+        vector = await self._embed(question)
+        if vector is None:
+            return None, None
+
+        self._evict_expired(time.monotonic(), datetime.date.today().toordinal())
+
+        specifics = question_specifics(question)
+        best_response = None
+        best_similarity = self.threshold
+        for _, _, cached_specifics, cached_vector, response in self._entries:
+            # Paraphrases must still ask about the same numbers and periods
+            if cached_specifics != specifics:
+                continue
+            # Both vectors are normalized, so the dot product is the cosine similarity
+            similarity = sum(a * b for a, b in zip(vector, cached_vector))
+            if similarity >= best_similarity:
+                best_response, best_similarity = response, similarity
+
+        if best_response is not None:
+            logger.info(f"Semantic cache hit (similarity {best_similarity:.3f}) for: {question}")
+        return best_response, (data_version, specifics, vector)
+
+    def store(self, key: Optional[tuple], response: Dict[str, Any]):
+        """
+        Store a response under the key returned by lookup()
+
+        Args:
+            key: Key returned by lookup(); nothing is stored if None
+            response: Response to reuse for similar questions
+        """
+        if key is None:
+            return
+
+        data_version, specifics, vector = key
+        if data_version != self._data_version:
+            # The sales data changed while this answer was being produced
+            return
+
+        if len(self._entries) >= self.max_entries:
+            # Oldest entries are at the front
+            self._entries.pop(0)
+        self._entries.append(
+            (time.monotonic(), datetime.date.today().toordinal(), specifics, vector, response)
+        )
+
+    def clear(self):
+        """Remove all cached responses"""
+        self._entries.clear()
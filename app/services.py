@@ -2,10 +2,33 @@
 Business services for sales operations
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
-from app.models import Product, Sale, Customer
+from sqlalchemy import func, desc, case, select
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+from app.cache import TTLCache
+from app.constants import ANALYSIS_PERIOD_DAYS
+from app.database import IS_SQLITE
+from app.models import Product, Sale, Customer, ProductSalesDaily
+
+# Module level (not per instance) because each request gets its own session
+_results_cache = TTLCache()
+
+# Product id -> (name, category, price); the catalog is small and rarely changes,
+# so it is read at most once per TTL and joined in Python instead of in every
+# aggregate query. Expiring with the results means renamed or repriced products
+# show up as soon as cached top-product lists do.
+_product_meta_cache = TTLCache(maxsize=1)
+
+@lru_cache(maxsize=1)
+def _analysis_cutoff(today: date) -> datetime:
+    """
+    Start of the analysis period for a given day
+    
+    Truncated to midnight, so every call on the same day shares one
+    cutoff (and one set of query parameters and cache entries).
+    """
+    return datetime.combine(today - timedelta(days=ANALYSIS_PERIOD_DAYS), time.min)
 
 class SalesService:
     """Service for sales-related operations"""
@@ -13,6 +36,33 @@ class SalesService:
     def __init__(self, db: Session):
         self.db = db
     
+    def _read(self, stmt):
+        """
+        Execute a read-only Core statement and return its rows as mappings
+        
+        Core rows skip ORM entity processing, and autoflush is disabled since
+        these aggregates never depend on pending changes in the session.
+        """
+        return self.db.execute(stmt.execution_options(autoflush=False)).mappings()
+    
+    @classmethod
+    def clear_cache(cls):
+        """Discard cached query results and product metadata; call after writing to the database"""
+        _results_cache.clear()
+        _product_meta_cache.clear()
+    
+    def _get_product_meta(self, product_ids: List[int]) -> Dict[int, Tuple[str, Optional[str], Any]]:
+        """Get the product metadata map, reloading it once expired or if any of product_ids is unknown"""
+        product_meta = _product_meta_cache.get("products")
+        if product_meta is None or not all(product_id in product_meta for product_id in product_ids):
+            rows = self._read(select(Product.id, Product.name, Product.category, Product.price))
+            product_meta = {
+                row['id']: (row['name'], row['category'], row['price'])
+                for row in rows
+            }
+            _product_meta_cache.set("products", product_meta)
+        return product_meta
+    
     def get_top_products_last_month(self, limit: int = 5) -> List[Dict[str, Any]]:
         """
         Get top products by quantity sold in the last month
@@ -23,82 +73,98 @@ class SalesService:
         Returns:
             List of dictionaries with product information and sales data
         """
+        # The date in the key rolls the cache over together with the analysis period
+        today = date.today()
+        cache_key = ("get_top_products_last_month", limit, today.isoformat())
+        cached = _results_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         # For demonstration purposes, using a wider date range since sample data is from 2025
         # In production, this would use the actual last month
-        today = datetime.now()
-        # Using last 12 months for demo data
-        last_period = today - timedelta(days=365)
+        last_period = _analysis_cutoff(today)
         
-        # Query to get top products by quantity sold in last month
-        results = (
-            self.db.query(
-                Product.id,
-                Product.name,
-                Product.category,
-                Product.price,
-                func.sum(Sale.quantity).label('total_quantity'),
-                func.sum(Sale.total_amount).label('total_revenue'),
-                func.count(Sale.id).label('total_sales')
+        # Query to get top products by quantity sold in last month (product metadata is looked up in memory)
+        if IS_SQLITE:
+            # Aggregated from the daily rollup only; revenue is stored in integer cents
+            stmt = (
+                select(
+                    ProductSalesDaily.product_id,
+                    func.sum(ProductSalesDaily.quantity).label('total_quantity'),
+                    (func.sum(ProductSalesDaily.revenue_cents) / 100.0).label('total_revenue'),
+                    func.sum(ProductSalesDaily.sales_count).label('total_sales')
+                )
+                .where(ProductSalesDaily.day >= last_period.date())
+                .group_by(ProductSalesDaily.product_id)
             )
-            .join(Sale, Product.id == Sale.product_id)
-            .filter(Sale.sale_date >= last_period)
-            .group_by(Product.id, Product.name, Product.category, Product.price)
-            .order_by(desc('total_quantity'))
-            .limit(limit)
-            .all()
-        )
+        else:
+            # The rollup is only maintained on SQLite; elsewhere aggregate sales directly
+            stmt = (
+                select(
+                    Sale.product_id,
+                    func.sum(Sale.quantity).label('total_quantity'),
+                    func.sum(Sale.total_amount).label('total_revenue'),
+                    func.count(Sale.id).label('total_sales')
+                )
+                .where(Sale.sale_date >= last_period)
+                .group_by(Sale.product_id)
+            )
+        stmt = stmt.order_by(desc('total_quantity')).limit(limit)
+        results = self._read(stmt).all()
+        product_meta = self._get_product_meta([result['product_id'] for result in results])
         
-        return [
-            {
-                "product_id": result.id,
-                "product_name": result.name,
-                "category": result.category,
-                "price": float(result.price) if result.price else 0,
-                "total_quantity_sold": result.total_quantity,
-                "total_revenue": float(result.total_revenue),
-                "total_number_of_sales": result.total_sales
-            }
-            for result in results
-        ]
+        products = []
+        for result in results:
+            meta = product_meta.get(result['product_id'])
+            if meta is None:
+                # Sales of a product that no longer exists (the rollup is not joined with products)
+                continue
+            name, category, price = meta
+            products.append({
+                "product_id": result['product_id'],
+                "product_name": name,
+                "category": category,
+                "price": float(price) if price else 0,
+                "total_quantity_sold": result['total_quantity'],
+                "total_revenue": float(result['total_revenue']),
+                "total_number_of_sales": result['total_sales']
+            })
+        _results_cache.set(cache_key, products)
+        return products
     
     def get_sales_stats(self) -> Dict[str, Any]:
         """Get general sales statistics"""
-        today = datetime.now()
-        # Using last 12 months for demo data (sample data is from 2025)
-        last_period = today - timedelta(days=365)
+        today = date.today()
+        cache_key = ("get_sales_stats", None, today.isoformat())
+        cached = _results_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
-        # Total sales count
-        total_sales = self.db.query(Sale).count()
-        
-        # Total revenue
-        total_revenue = self.db.query(func.sum(Sale.total_amount)).scalar() or 0
+        # Using last 12 months for demo data (sample data is from 2025)
+        last_period = _analysis_cutoff(today)
         
-        # Sales in period
-        sales_last_month = (
-            self.db.query(Sale)
-            .filter(Sale.sale_date >= last_period)
-            .count()
-        )
+        in_period = Sale.sale_date >= last_period
         
-        # Revenue in period
-        revenue_last_month = (
-            self.db.query(func.sum(Sale.total_amount))
-            .filter(Sale.sale_date >= last_period)
-            .scalar() or 0
+        # All statistics in one round-trip: conditional aggregation over sales
+        # plus scalar subqueries for the customer and product counts
+        stmt = select(
+            func.count(Sale.id).label('total_sales'),
+            func.coalesce(func.sum(Sale.total_amount), 0).label('total_revenue'),
+            func.coalesce(func.sum(case((in_period, 1), else_=0)), 0).label('sales_last_month'),
+            func.coalesce(func.sum(case((in_period, Sale.total_amount), else_=0)), 0).label('revenue_last_month'),
+            select(func.count(Customer.id)).scalar_subquery().label('total_customers'),
+            select(func.count(Product.id)).scalar_subquery().label('total_products')
         )
+        result = self._read(stmt).one()
         
-        # Total unique customers
-        total_customers = self.db.query(Customer).count()
-        
-        # Total products
-        total_products = self.db.query(Product).count()
-        
-        return {
-            "total_sales": total_sales,
-            "total_revenue": float(total_revenue),
-            "sales_last_month": sales_last_month,
-            "revenue_last_month": float(revenue_last_month),
-            "total_customers": total_customers,
-            "total_products": total_products,
+        stats = {
+            "total_sales": result['total_sales'],
+            "total_revenue": float(result['total_revenue']),
+            "sales_last_month": result['sales_last_month'],
+            "revenue_last_month": float(result['revenue_last_month']),
+            "total_customers": result['total_customers'],
+            "total_products": result['total_products'],
             "period_analyzed": f"Last 12 months (from {last_period.strftime('%Y-%m-%d')} to {today.strftime('%Y-%m-%d')})"
-        } 
\ No newline at end of file
+        }
+        _results_cache.set(cache_key, stats)
+        return stats
@@ -4,15 +4,24 @@ Sales Analysis Chat - Simple Interactive Chat
 Connects to the FastAPI sales insights API
 """
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import re
 import sys
 from typing import Dict, Any
 
 # API Configuration
 API_BASE_URL = "http://localhost:8000"
-SALES_INSIGHTS_ENDPOINT = f"{API_BASE_URL}/sales-insights"
+SALES_INSIGHTS_ENDPOINT = f"{API_BASE_URL}/sales-insights/full"
 HEALTH_ENDPOINT = f"{API_BASE_URL}/health"
 
+# Shared session: keep-alive reuses the same socket across questions
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
+# Paired <think>...</think> blocks (with their content) or any orphan think tag
+_THINK_RE = re.compile(r'<think\b[^>]*>.*?</think>|</?think[^>]*>', re.DOTALL)
+
 def print_header():
     """Print the chat header"""
     print("\n🤖 Sales Analysis Chat - Ollama + MCP")
@@ -23,7 +32,7 @@ def print_header():
 def check_api_health() -> bool:
     """Check if the API is running and healthy"""
     try:
-        response = requests.get(HEALTH_ENDPOINT, timeout=5)
+        response = SESSION.get(HEALTH_ENDPOINT, timeout=5)
         if response.status_code == 200:
             health_data = response.json()
             print(f"✅ API conectada - Modelo: {health_data.get('model', 'N/A')}")
@@ -45,7 +54,7 @@ def ask_question(question: str) -> Dict[str, Any]:
         print("   ⏳ Aguardando resposta do LLM...")
         
         # Make the API call
-        response = requests.get(
+        response = SESSION.get(
             SALES_INSIGHTS_ENDPOINT,
             params={"question": question},
             timeout=300  # Increased timeout for LLM processing
@@ -81,22 +90,9 @@ def format_response(result: Dict[str, Any]) -> str:
     tools_used = result.get("mcp_tools_used", [])
     model_used = result.get("model_used", "N/A")
     
-    # Clean up answer (remove <think> tags if present)
-    if answer and "<think>" in answer:
-        # Extract only the part after </think>
-        parts = answer.split("</think>")
-        if len(parts) > 1:
-            answer = parts[1].strip()
-        else:
-            # If no closing tag, remove the opening tag and everything before it
-            parts = answer.split("<think>")
-            if len(parts) > 1:
-                answer = parts[-1].strip()
-    
-    # Remove any remaining think tags
+    # Clean up answer (remove <think> blocks and tags if present)
     if answer:
-        import re
-        answer = re.sub(r'</?think[^>]*>', '', answer).strip()
+        answer = _THINK_RE.sub('', answer).strip()
     
     formatted = f"✅ Resposta:\n{answer}\n"
     
@@ -4,18 +4,406 @@ MCP Tools for Sales Database Access
 This module contains all MCP tools for querying sales data.
 Each function decorated with @mcp.tool() becomes available to the LLM.
 """
+import asyncio
+import atexit
+import os
+import re
 import sqlite3
 import json
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+import queue
+import threading
+from contextlib import closing, contextmanager
+from functools import lru_cache
+from urllib.parse import quote
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 import logging
 
 from fastmcp import FastMCP
-from app.constants import DATABASE_FILE
+from app.cache import TTLCache
+from app.constants import (
+    DATABASE_FILE, DATABASE_TABLES, MCP_QUERY_MAX_ROWS, MCP_QUERY_FETCH_BATCH_SIZE,
+    MCP_SQLITE_POOL_SIZE
+)
+from app.rollups import ensure_rollups
 
 logger = logging.getLogger(__name__)
 
+# Persistent in the database file, so it is set once per process on a short-lived writable
+# connection (the pooled ones are opened read-only and cannot change it)
+SQLITE_JOURNAL_MODE_PRAGMA = "PRAGMA journal_mode=WAL"
+
+# Applied once when the pool opens a connection
+SQLITE_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",  # 64 MB page cache
+    "PRAGMA mmap_size=268435456",  # memory-map up to 256 MB
+    "PRAGMA temp_store=MEMORY",
+    # Last: tool connections only ever read; SQLite itself rejects any write (defense in depth)
+    "PRAGMA query_only=ON",
+)
+
+# sqlite3 keeps compiled statements per connection, keyed by SQL text, so the
+# fixed-shape tool queries live in constants and always hit that cache
+SQLITE_CACHED_STATEMENTS = 256
+
+# Period summaries for get_sales_by_period: one shared SELECT, one WHERE clause per period type
+_SALES_PERIOD_SUMMARY_SELECT = """
+SELECT 
+    COUNT(*) as total_sales,
+    SUM(quantity) as total_items,
+    SUM(total_amount) as total_revenue,
+    AVG(total_amount) as avg_order_value,
+    MIN(sale_date) as first_sale,
+    MAX(sale_date) as last_sale
+FROM sales 
+"""
+# Half-open ranges on the raw column (not strftime/date of it) so ix_sales_date_amount is used;
+# each range ends before date(?, modifier), which also covers the timestamps of the last day
+SALES_BY_PERIOD_QUERIES = {
+    'month': _SALES_PERIOD_SUMMARY_SELECT + "WHERE sale_date >= ? AND sale_date < date(?, '+1 month')",
+    'day': _SALES_PERIOD_SUMMARY_SELECT + "WHERE sale_date >= ? AND sale_date < date(?, '+1 day')",
+    'year': _SALES_PERIOD_SUMMARY_SELECT + "WHERE sale_date >= ? AND sale_date < date(?, '+1 year')",
+    # Monday to Sunday of the week containing the given date
+    'week': _SALES_PERIOD_SUMMARY_SELECT + (
+        "WHERE sale_date >= date(?, 'weekday 0', '-6 days') "
+        "AND sale_date < date(?, 'weekday 0', '+1 day')"
+    ),
+}
+
+# period_type -> (query, period_value -> params, period_value -> display name); both
+# placeholders of each range take the period start
+PERIOD_HANDLERS = {
+    # Format: '2025-02'
+    'month': (SALES_BY_PERIOD_QUERIES['month'], lambda value: (f"{value}-01",) * 2, lambda value: f"mês {value}"),
+    # Format: '2025-02-28'
+    'day': (SALES_BY_PERIOD_QUERIES['day'], lambda value: (value,) * 2, lambda value: f"dia {value}"),
+    # Format: '2025'
+    'year': (SALES_BY_PERIOD_QUERIES['year'], lambda value: (f"{value}-01-01",) * 2, lambda value: f"ano {value}"),
+    # Format: '2025-02-24' (any day in the week)
+    'week': (SALES_BY_PERIOD_QUERIES['week'], lambda value: (value,) * 2, lambda value: f"semana que contém {value}"),
+}
+
+# Appended to the schema so the model writes timestamp-safe date filters
+SCHEMA_DATE_QUERY_NOTES = """⚠️ IMPORTANTE - CONSULTAS DE DATA:
+- A coluna 'sale_date' contém TIMESTAMPS completos (YYYY-MM-DD HH:MM:SS)
+- Para consultas por período, use funções de data do SQLite:
+  * strftime('%Y-%m', sale_date) para filtrar por mês
+  * date(sale_date) para filtrar por dia
+  * EVITE usar BETWEEN com strings de data!
+
+EXEMPLOS SEGUROS:
+✅ SELECT * FROM sales WHERE strftime('%Y-%m', sale_date) = '2025-02'
+✅ SELECT * FROM sales WHERE date(sale_date) = '2025-02-28'
+❌ SELECT * FROM sales WHERE sale_date BETWEEN '2025-02-01' AND '2025-02-28'
+"""
+
+# Every column of every user table in one statement (table-valued PRAGMA joined to the catalog)
+_TABLES_SQL_LIST = ", ".join(f"'{table_name}'" for table_name in DATABASE_TABLES)
+
+SCHEMA_COLUMNS_QUERY = f"""
+SELECT m.name AS table_name, p.name, p.type, p.pk, p."notnull", p.dflt_value
+FROM sqlite_master m
+JOIN pragma_table_info(m.name) p
+WHERE m.type = 'table' AND m.name IN ({_TABLES_SQL_LIST})
+ORDER BY m.rowid, p.cid
+"""
+
+# Bumped by SQLite on every schema change; keys the memoized column listing
+SCHEMA_VERSION_QUERY = "PRAGMA schema_version"
+
+# The table list is static, so the row counts are one fixed statement built at import time
+SCHEMA_COUNTS_QUERY = " UNION ALL ".join(
+    f"SELECT '{table_name}' AS table_name, COUNT(*) AS count FROM {table_name}"
+    for table_name in DATABASE_TABLES
+)
+
+# Approximate counts from ANALYZE statistics: the leading number of an index's stat is
+# its row count. COALESCE only falls back to a full COUNT(*) for tables without statistics
+SCHEMA_APPROXIMATE_COUNTS_QUERY = " UNION ALL ".join(
+    f"SELECT '{table_name}' AS table_name, COALESCE("
+    f"(SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = '{table_name}'), "
+    f"(SELECT COUNT(*) FROM {table_name})) AS count"
+    for table_name in DATABASE_TABLES
+)
+STAT1_EXISTS_QUERY = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+
+# All general statistics in one pass over sales, plus the two catalog counts
+SALES_STATISTICS_QUERY = """
+SELECT
+    COUNT(*) as total_orders,
+    COALESCE(SUM(total_amount), 0) as total_revenue,
+    MIN(sale_date) as min_date,
+    MAX(sale_date) as max_date,
+    (SELECT COUNT(*) FROM products) as total_products,
+    (SELECT COUNT(*) FROM customers) as total_customers
+FROM sales
+"""
+
+# Month-over-month growth (vs. the previous month) computed in SQL with window functions;
+# revenue stays in integer cents (exact, and formatted without a float round-trip)
+_MONTHLY_TRENDS_TEMPLATE = """
+SELECT
+    month,
+    orders,
+    revenue_cents,
+    -- Rounded half up to whole cents in integer arithmetic
+    (2 * revenue_cents + orders) / (2 * orders) AS avg_order_value_cents,
+    CASE WHEN LAG(orders) OVER w > 0
+        THEN 100.0 * (orders - LAG(orders) OVER w) / LAG(orders) OVER w
+    END AS order_growth,
+    CASE WHEN LAG(revenue_cents) OVER w > 0
+        THEN 100.0 * (revenue_cents - LAG(revenue_cents) OVER w) / LAG(revenue_cents) OVER w
+    END AS revenue_growth
+FROM {source}
+WINDOW w AS (ORDER BY month)
+ORDER BY month
+"""
+MONTHLY_TRENDS_QUERY = _MONTHLY_TRENDS_TEMPLATE.format(source="monthly_sales_rollup")
+# Same result aggregated on the fly, for databases where the rollup cannot be built (e.g. read-only files)
+MONTHLY_TRENDS_FROM_SALES_QUERY = _MONTHLY_TRENDS_TEMPLATE.format(source="""(
+    SELECT
+        strftime('%Y-%m', sale_date) AS month,
+        COUNT(*) AS orders,
+        SUM(CAST(ROUND(total_amount * 100) AS INTEGER)) AS revenue_cents
+    FROM sales
+    GROUP BY 1
+)""")
+
+# Compact JSON for the model (indentation only adds tokens); set MCP_PRETTY_JSON=1 to inspect results by hand
+JSON_PRETTY = os.getenv("MCP_PRETTY_JSON", "").lower() in ("1", "true", "yes")
+
+# MCP_SQLITE_IMMUTABLE=1 opens the pooled connections with immutable=1: SQLite then takes no
+# locks and never checks the file for changes. Only safe when nothing writes the database
+# while the server runs (build it, and its rollups, with the setup scripts beforehand)
+SQLITE_IMMUTABLE = os.getenv("MCP_SQLITE_IMMUTABLE", "").lower() in ("1", "true", "yes")
+JSON_DUMPS_OPTIONS = {"indent": 2} if JSON_PRETTY else {"separators": (",", ":")}
+# Built once: json.dumps with any non-default option constructs a new encoder per call.
+# Without indent, encode() runs entirely in the C accelerator (_json.make_encoder)
+JSON_RESULT_ENCODER = json.JSONEncoder(default=str, ensure_ascii=False, **JSON_DUMPS_OPTIONS)
+
+# String literals, quoted identifiers and comments: keywords inside them are harmless
+_SQL_NON_CODE_RE = re.compile(
+    r"'(?:[^']|'')*'"
+    r'|"(?:[^"]|"")*"'
+    r"|`[^`]*`"
+    r"|\[[^\]]*\]"
+    r"|--[^\n]*"
+    r"|/\*.*?(?:\*/|$)",
+    re.DOTALL
+)
+DANGEROUS_SQL_KEYWORDS = [
+    'DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE', 'TRUNCATE',
+    'ATTACH', 'DETACH', 'PRAGMA', 'VACUUM', 'REINDEX'
+]
+_DANGEROUS_SQL_TOKENS = frozenset(DANGEROUS_SQL_KEYWORDS)
+# Whole words, so columns like created_at (or pragma_table_info) are single tokens, not CREATE (or PRAGMA)
+_SQL_WORD_RE = re.compile(r"\w+")
+# Plain SELECT or a CTE (WITH ... SELECT); the statement after the CTE list is checked separately
+_SELECT_PREFIX_RE = re.compile(r"\s*(SELECT|WITH)\b", re.IGNORECASE)
+# Words and the punctuation that delimits CTE definitions
+_SQL_CTE_TOKEN_RE = re.compile(r"\w+|[(),]")
+# The ":N" suffix SQLite gives repeated column names in a subquery
+_DUPLICATE_COLUMN_SUFFIX_RE = re.compile(r":\d+$")
+
+@lru_cache(maxsize=512)
+def _sql_code(query: str) -> str:
+    """
+    Code of a query, with strings and comments blanked out and the end trimmed
+    
+    Blanking keeps every character's position, so the result's length is also
+    where the statement ends in the original query: trailing semicolons,
+    comments and whitespace are cut off.
+    
+    Args:
+        query: SQL query as written by the caller
+        
+    Returns:
+        The query's code up to its last meaningful character
+    """
+    code = _SQL_NON_CODE_RE.sub(lambda match: " " * len(match.group()), query)
+    return code.rstrip("; \t\r\n")
+
+def _parentheses_balanced(code: str) -> bool:
+    """Whether every parenthesis in code (strings and comments blanked out) is closed, and never closed early"""
+    depth = 0
+    for char in code:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth < 0:
+                return False
+    return depth == 0
+
+def _cte_statement_keyword(code: str) -> Optional[str]:
+    """
+    First keyword of the statement that follows a WITH clause's CTE list
+    
+    At nesting depth 0, a ")" closes either a CTE's column list (followed by AS)
+    or its body (followed by "," and the next CTE, or by the main statement).
+    
+    Args:
+        code: Query starting with WITH, with strings and comments already blanked out
+        
+    Returns:
+        The upper-cased keyword, or None if no statement follows the CTE list
+    """
+    depth = 0
+    tokens = _SQL_CTE_TOKEN_RE.findall(code)
+    for index, token in enumerate(tokens):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+            if depth == 0 and index + 1 < len(tokens):
+                following = tokens[index + 1].upper()
+                if following not in (",", "AS"):
+                    return following
+    return None
+
+@lru_cache(maxsize=512)
+def _validate_select_query(query: str) -> Optional[str]:
+    """
+    Check that a query is a read-only SELECT
+    
+    Memoized because the model often re-emits the exact same SQL. The pooled
+    connections are also opened read-only, as a second line of defense.
+    
+    Args:
+        query: SQL query to validate
+        
+    Returns:
+        Error message if the query is rejected, None if it is allowed
+    """
+    code = _sql_code(query)
+    
+    # Validate query - only allow SELECT statements
+    prefix = _SELECT_PREFIX_RE.match(code)
+    if not prefix:
+        return "Error: Only SELECT queries are allowed. Query must start with SELECT or WITH."
+    
+    # The query runs as a subquery: a second statement, or a ")" closing it early, would not be the query asked for
+    if ";" in code:
+        return "Error: Only a single SELECT statement is allowed."
+    if not _parentheses_balanced(code):
+        return "Error: Query has unbalanced parentheses."
+    
+    # WITH also introduces writes (e.g. WITH ... REPLACE INTO); the CTE list must lead to a SELECT
+    if prefix.group(1).upper() == "WITH" and _cte_statement_keyword(code) != "SELECT":
+        return "Error: Only SELECT queries are allowed. A WITH clause must be followed by SELECT."
+    
+    # Prevent potentially dangerous operations: one set lookup per word of the query
+    if not _DANGEROUS_SQL_TOKENS.isdisjoint(map(str.upper, _SQL_WORD_RE.findall(code))):
+        return f"Error: Query contains dangerous keywords: {DANGEROUS_SQL_KEYWORDS}"
+    
+    return None
+
+def _wrap_user_query(query: str) -> str:
+    """User query as a subquery, without its trailing semicolons and comments (see _sql_code)"""
+    return f"(\n{query[:len(_sql_code(query))]}\n)"
+
+def _sql_string(value: str) -> str:
+    """SQL string literal"""
+    return "'" + value.replace("'", "''") + "'"
+
+def _sql_identifier(value: str) -> str:
+    """SQL quoted identifier"""
+    return '"' + value.replace('"', '""') + '"'
+
+def _format_cents(cents: int) -> str:
+    """Format integer cents as 1,234.56 using integer arithmetic only"""
+    sign = "-" if cents < 0 else ""
+    units, cents = divmod(abs(cents), 100)
+    return f"{sign}{units:,}.{cents:02d}"
+
+def _column_names(cursor: sqlite3.Cursor) -> List[str]:
+    """
+    Column names of a cursor's result, read once per statement (plain tuples are cheaper than sqlite3.Row)
+    
+    Repeated names (e.g. the id of both tables in a SELECT * join) get a ":N"
+    suffix, compared case-insensitively as SQLite does, so that building
+    dictionaries never silently drops a column. The suffixes SQLite itself
+    gives subquery columns (random past the fifth repeat) are renumbered the
+    same way, so a result always gets the same names.
+    """
+    names = []
+    seen = set()
+    for column in cursor.description or ():
+        name = column[0]
+        base = _DUPLICATE_COLUMN_SUFFIX_RE.sub("", name)
+        if base != name and base.lower() in seen:
+            name = base
+        unique_name = name
+        suffix = 0
+        while unique_name.lower() in seen:
+            suffix += 1
+            unique_name = f"{name}:{suffix}"
+        seen.add(unique_name.lower())
+        names.append(unique_name)
+    return names
+
+def _json_number(value: Any) -> Any:
+    """Floats rounded to the 15 significant digits SQLite's JSON output has; other values unchanged"""
+    # + 0.0 turns -0.0 into 0.0, as SQLite prints it
+    return float(f"{value:.15g}") + 0.0 if type(value) is float else value
+
+def _json_value_sql(column: str) -> str:
+    """
+    SQL expression serializing a column for json_object
+    
+    REAL values are printed with printf's alternate form so that whole
+    numbers keep their decimal point (30.0, not 30) whatever the SQLite build;
+    very large or small ones use the plain exponent form (1e+20), like Python.
+    """
+    identifier = _sql_identifier(column)
+    number_format = (
+        f"CASE WHEN {identifier} = 0 OR (abs({identifier}) >= 1e-4 AND abs({identifier}) < 1e15) "
+        f"THEN '%!.15g' ELSE '%.15g' END"
+    )
+    return (
+        f"CASE WHEN typeof({identifier}) = 'real' "
+        f"THEN json(printf({number_format}, {identifier})) ELSE {identifier} END"
+    )
+
+class LazyResult:
+    """
+    Rows of a fully fetched query, turned into dictionaries only when accessed
+    
+    Stores the plain tuples returned by sqlite3 plus the column names; the
+    aggregate tools read a single row out of their result, so they build one
+    dict instead of one per row. Built dicts are cached by row index.
+    """
+    
+    __slots__ = ("rows", "columns", "_dicts")
+    
+    def __init__(self, rows: List[tuple], columns: List[str]):
+        self.rows = rows
+        self.columns = columns
+        self._dicts: Dict[int, Dict[str, Any]] = {}
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        if index < 0:
+            index += len(self.rows)
+        row = self._dicts.get(index)
+        if row is None:
+            # Raises IndexError for out of range indexes, like a list
+            row = dict(zip(self.columns, self.rows[index]))
+            self._dicts[index] = row
+        return row
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self.rows)):
+            yield self[index]
+    
+    def get_data(self) -> List[Dict[str, Any]]:
+        """All rows as a list of dictionaries"""
+        return list(self)
+
 @dataclass
 class DatabaseQuery:
     """Helper class for database queries"""
@@ -25,21 +413,154 @@ class DatabaseQuery:
 class SalesMCPTools:
     """Tools for accessing sales database via MCP"""
     
-    def __init__(self, db_path: str = DATABASE_FILE):
+    def __init__(self, db_path: str = DATABASE_FILE, pool_size: int = MCP_SQLITE_POOL_SIZE):
         self.db_path = db_path
+        # Resolved once; read-only URI of the pooled connections
+        db_uri = f"file:{quote(os.path.abspath(db_path))}?mode=ro"
+        self._db_uri = db_uri + "&immutable=1" if SQLITE_IMMUTABLE else db_uri
+        self._journal_mode_set = False
+        # Formatted results of the aggregate tools, keyed by (tool name, day)
+        self.cache = TTLCache()
+        self._rollups_ready: Optional[bool] = None
+        self._rollups_lock = threading.Lock()
+        self._has_statistics: Optional[bool] = None
+        # (schema_version, column rows) of the last schema introspection
+        self._schema_columns: Optional[Tuple[int, LazyResult]] = None
+        # Long-lived connections keep SQLite's page cache warm between tool calls; they are
+        # opened on demand up to pool_size and shared by whichever worker thread needs one
+        self.pool_size = pool_size
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=pool_size)
+        self._pool_opened = 0
+        self._pool_lock = threading.Lock()
+        atexit.register(self.close)
+    
+    def clear_cache(self):
+        """Discard cached tool results; call after writing to the database"""
+        self.cache.clear()
+    
+    def _set_journal_mode(self):
+        """Switch the database to WAL (concurrent readers) once per process"""
+        with self._pool_lock:
+            if self._journal_mode_set:
+                return
+            self._journal_mode_set = True
+        if SQLITE_IMMUTABLE:
+            return
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute(SQLITE_JOURNAL_MODE_PRAGMA)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            # e.g. a read-only file: still readable in its current journal mode
+            logger.warning(f"Journal mode unchanged: {e}")
+    
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open and configure a new pooled connection"""
+        self._set_journal_mode()
+        # Read-only URI: SQLite opens the file without write access at all.
+        # Autocommit mode: read-only tool queries never hold a transaction open;
+        # check_same_thread is off because a connection moves between worker threads
+        conn = sqlite3.connect(
+            self._db_uri,
+            uri=True,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=SQLITE_CACHED_STATEMENTS
+        )
+        for pragma in SQLITE_CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
     
-    def _execute_query(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
-        """Execute a database query and return results as list of dictionaries"""
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Check a connection out of the pool for the duration of the block
+        
+        Reuses an idle connection (the most recently returned one, whose cache
+        is warmest), opens a new one while fewer than pool_size exist, and
+        otherwise waits for one to be returned.
+        """
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                can_open = self._pool_opened < self.pool_size
+                if can_open:
+                    self._pool_opened += 1
+            if can_open:
+                try:
+                    conn = self._open_connection()
+                except BaseException:
+                    with self._pool_lock:
+                        self._pool_opened -= 1
+                    raise
+            else:
+                conn = self._pool.get()
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row  # This enables column access by name
-                cursor = conn.cursor()
-                cursor.execute(query, params)
+            yield conn
+        finally:
+            self._pool.put(conn)
+    
+    def close(self):
+        """Close the idle pooled connections (registered to run at exit)"""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            with self._pool_lock:
+                self._pool_opened -= 1
+            conn.close()
+    
+    def ensure_rollups(self) -> bool:
+        """
+        Build missing rollup tables once per process (e.g. on databases created before they existed)
+        
+        Returns:
+            True if the rollup tables can be read, False if they could not be built
+            (or must not be, with MCP_SQLITE_IMMUTABLE set)
+        """
+        if self._rollups_ready is not None:
+            return self._rollups_ready
+        if SQLITE_IMMUTABLE:
+            # Immutable readers must never see the file change under them: no writes at all,
+            # so trends are aggregated from sales instead
+            self._rollups_ready = False
+            return self._rollups_ready
+        # Tools run in worker threads; only one of them may build the rollups
+        with self._rollups_lock:
+            if self._rollups_ready is not None:
+                return self._rollups_ready
+            try:
+                # Short-lived writable connection: the cached ones are query_only
+                conn = sqlite3.connect(self.db_path)
+                try:
+                    with conn:
+                        built = ensure_rollups(conn)
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Rollup tables unavailable, aggregating from sales instead: {e}")
+                self._rollups_ready = False
+            else:
+                if built:
+                    logger.info("Rollup tables built")
+                self._rollups_ready = True
+            return self._rollups_ready
+    
+    def _execute_query(self, query: str, params: tuple = ()) -> LazyResult:
+        """Execute a database query and return results as lazily built dictionaries"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.execute(query, params)
                 
-                # Fetch all results and convert to list of dictionaries
+                # Fetch all results (finishing the statement before the connection goes back
+                # to the pool); rows become dictionaries only when read
                 rows = cursor.fetchall()
-                return [dict(row) for row in rows]
-                
+                return LazyResult(rows, _column_names(cursor))
+            
         except sqlite3.Error as e:
             logger.error(f"Database error: {e}")
             raise Exception(f"Database query failed: {str(e)}")
@@ -47,6 +568,140 @@ class SalesMCPTools:
             logger.error(f"Unexpected error in query: {e}")
             raise Exception(f"Query execution failed: {str(e)}")
 
+    def _iter_batches(
+        self, query: str, params: tuple = (), batch_size: int = MCP_QUERY_FETCH_BATCH_SIZE
+    ) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """
+        Execute a database query and yield (column names, rows) for each batch of raw tuples
+        
+        The pooled connection stays checked out until the generator is exhausted or closed.
+        """
+        with self._connection() as conn:
+            try:
+                cursor = conn.execute(query, params)
+            except sqlite3.Error as e:
+                logger.error(f"Database error: {e}")
+                raise Exception(f"Database query failed: {str(e)}")
+            
+            try:
+                columns = _column_names(cursor)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield columns, rows
+            except sqlite3.Error as e:
+                logger.error(f"Database error: {e}")
+                raise Exception(f"Database query failed: {str(e)}")
+            finally:
+                # Closing early releases the statement (and its read snapshot) if the caller stops iterating
+                cursor.close()
+
+    def _iter_query(
+        self, query: str, params: tuple = (), batch_size: int = MCP_QUERY_FETCH_BATCH_SIZE
+    ) -> Iterator[Dict[str, Any]]:
+        """Execute a database query and yield rows as dictionaries, fetching them in batches"""
+        with closing(self._iter_batches(query, params, batch_size)) as batches:
+            for columns, rows in batches:
+                for row in rows:
+                    yield dict(zip(columns, row))
+
+    def schema_columns(self) -> LazyResult:
+        """
+        Columns of DATABASE_TABLES, re-introspected only when the schema changes
+        
+        Returns:
+            Rows of SCHEMA_COLUMNS_QUERY
+        """
+        version = self._execute_query(SCHEMA_VERSION_QUERY)[0]['schema_version']
+        cached = self._schema_columns
+        if cached is None or cached[0] != version:
+            cached = (version, self._execute_query(SCHEMA_COLUMNS_QUERY))
+            self._schema_columns = cached
+        return cached[1]
+    
+    def approximate_counts(self) -> LazyResult:
+        """
+        Row counts of DATABASE_TABLES without scanning them when possible
+        
+        Reads sqlite_stat1 (written by ANALYZE after each load), so counts
+        may lag behind rows inserted since; use COUNT(*) where exact totals matter.
+        
+        Returns:
+            List of {"table_name", "count"} dictionaries
+        """
+        if self._has_statistics is None:
+            self._has_statistics = bool(self._execute_query(STAT1_EXISTS_QUERY))
+        query = SCHEMA_APPROXIMATE_COUNTS_QUERY if self._has_statistics else SCHEMA_COUNTS_QUERY
+        return self._execute_query(query)
+    
+    def _fetch_rows(self, query: str, max_rows: int) -> List[Dict[str, Any]]:
+        """
+        Execute a user query and return at most max_rows rows, shaped like _fetch_json's
+        
+        Reads the same subquery as _fetch_json, so both paths see the same column
+        names, and rounds floats the way SQLite's JSON output does.
+        """
+        rows = self._iter_query(f"SELECT * FROM {_wrap_user_query(query)} LIMIT ?", (max_rows,))
+        try:
+            return [
+                {column: _json_number(value) for column, value in row.items()}
+                for row in rows
+            ]
+        finally:
+            rows.close()
+    
+    def _fetch_json(self, query: str, max_rows: int) -> Optional[Tuple[int, str]]:
+        """
+        Execute a database query and serialize its first max_rows rows to JSON inside SQLite
+        
+        json_group_array(json_object(...)) builds the whole array in C, so no
+        Python tuple or dict is created per row. The column names come from
+        preparing the query with LIMIT 0; the values are then read by position
+        through a CTE column list, since SQLite may rename repeated columns
+        differently each time a statement is prepared.
+        
+        Returns:
+            (row count, JSON array) where the count may be max_rows + 1 to signal
+            truncation, or None if SQLite could not serialize the result (e.g. BLOB
+            values or too many columns); callers then fall back to _fetch_rows
+        """
+        subquery = _wrap_user_query(query)
+        try:
+            with self._connection() as conn:
+                cursor = conn.execute(f"SELECT * FROM {subquery} LIMIT 0")
+                columns = _column_names(cursor)
+                cursor.close()
+                positions = [f"c{index}" for index in range(len(columns))]
+                json_pairs = ", ".join(
+                    f"{_sql_string(column)}, {_json_value_sql(position)}"
+                    for column, position in zip(columns, positions)
+                )
+                # One row past the cap is read to detect truncation, then removed from the array
+                json_query = f"""
+                WITH mcp_result({", ".join(positions)}) AS {subquery}
+                SELECT row_count, CASE WHEN row_count > ? THEN json_remove(rows, '$[#-1]') ELSE rows END
+                FROM (
+                    SELECT COUNT(*) AS row_count, json_group_array(json_object({json_pairs})) AS rows
+                    FROM (SELECT * FROM mcp_result LIMIT ?)
+                )
+                """
+                # fetchall finishes the statement before the connection goes back to the pool
+                (row_count, rows_json), = conn.execute(json_query, (max_rows, max_rows + 1)).fetchall()
+        except sqlite3.Error as e:
+            logger.debug(f"Result not serialized by SQLite, using Python: {e}")
+            return None
+        return row_count, rows_json
+    
+    async def run(self, func, *args):
+        """
+        Run a blocking database call in a worker thread
+        
+        Keeps the MCP server's event loop free to serve other tool calls
+        while SQLite works (each call checks out its own pooled connection).
+        """
+        return await asyncio.to_thread(func, *args)
+
 # Initialize tools instance
 sales_tools = SalesMCPTools()
 
@@ -54,11 +709,11 @@ def register_tools(mcp: FastMCP):
     """Register all MCP tools with the FastMCP instance"""
     
     @mcp.tool()
-    def query_sales_data(query: str) -> str:
+    async def query_sales_data(query: str) -> str:
         """
         Execute a SQL SELECT query on the sales database.
         
-        IMPORTANT: Only SELECT queries are allowed for security.
+        IMPORTANT: Only SELECT queries (optionally starting with a WITH clause) are allowed for security.
         
         Args:
             query: SQL SELECT query to execute
@@ -71,26 +726,36 @@ def register_tools(mcp: FastMCP):
             - "SELECT SUM(total_amount) as total_revenue FROM sales"
             - "SELECT p.name, SUM(s.quantity) as units_sold FROM sales s JOIN products p ON s.product_id = p.id GROUP BY p.id ORDER BY units_sold DESC LIMIT 5"
         """
-        # Validate query - only allow SELECT statements
-        query_stripped = query.strip().upper()
-        if not query_stripped.startswith('SELECT'):
-            return f"Error: Only SELECT queries are allowed. Query must start with SELECT."
-        
-        # Prevent potentially dangerous operations
-        dangerous_keywords = ['DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE', 'TRUNCATE']
-        if any(keyword in query_stripped for keyword in dangerous_keywords):
-            return f"Error: Query contains dangerous keywords: {dangerous_keywords}"
+        validation_error = _validate_select_query(query)
+        if validation_error:
+            return validation_error
         
         try:
-            results = sales_tools._execute_query(query)
+            # Compact output is produced by SQLite directly; indented output (and any
+            # result SQLite cannot serialize) goes through the Python encoder
+            json_result = None
+            if not JSON_PRETTY:
+                json_result = await sales_tools.run(sales_tools._fetch_json, query, MCP_QUERY_MAX_ROWS)
+            
+            if json_result is not None:
+                row_count, formatted_results = json_result
+            else:
+                # Read at most one row past the cap, so memory stays bounded whatever the query returns
+                results = await sales_tools.run(sales_tools._fetch_rows, query, MCP_QUERY_MAX_ROWS + 1)
+                row_count = len(results)
+                formatted_results = JSON_RESULT_ENCODER.encode(results[:MCP_QUERY_MAX_ROWS])
             
-            if not results:
+            if not row_count:
                 return "Query executed successfully but returned no results."
             
-            # Format results for better readability
-            formatted_results = json.dumps(results, indent=2, default=str)
+            truncated = row_count > MCP_QUERY_MAX_ROWS
+            if truncated:
+                row_count = MCP_QUERY_MAX_ROWS
             
-            return f"Query results ({len(results)} rows):\n{formatted_results}"
+            header = f"Query results ({row_count} rows"
+            if truncated:
+                header += f", truncated to the first {MCP_QUERY_MAX_ROWS}; add LIMIT or aggregate to narrow it"
+            return f"{header}):\n{formatted_results}"
             
         except Exception as e:
             error_msg = f"Error executing query: {str(e)}"
@@ -98,7 +763,7 @@ def register_tools(mcp: FastMCP):
             return error_msg
 
     @mcp.tool()
-    def get_database_schema() -> str:
+    async def get_database_schema() -> str:
         """
         Get the database schema information (table structure).
         
@@ -106,57 +771,44 @@ def register_tools(mcp: FastMCP):
             Database schema information including table names, columns, and types
         """
         try:
-            # Get table names
-            tables_query = "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
-            tables = sales_tools._execute_query(tables_query)
-            
-            schema_info = "Database Schema:\n\n"
-            
-            for table in tables:
-                table_name = table['name']
-                schema_info += f"Table: {table_name}\n"
-                
-                # Get column information
-                columns_query = f"PRAGMA table_info({table_name})"
-                columns = sales_tools._execute_query(columns_query)
+            # Column information and row counts for all tables, fetched concurrently
+            columns, counts = await asyncio.gather(
+                sales_tools.run(sales_tools.schema_columns),
+                sales_tools.run(sales_tools.approximate_counts)
+            )
+            
+            lines = ["Database Schema:", ""]
+            
+            table_names = []
+            for col in columns:
+                table_name = col['table_name']
+                if not table_names or table_names[-1] != table_name:
+                    if table_names:
+                        lines.append("")
+                    table_names.append(table_name)
+                    lines.append(f"Table: {table_name}")
                 
-                for col in columns:
-                    schema_info += f"  - {col['name']}: {col['type']}"
-                    if col['pk']:
-                        schema_info += " (PRIMARY KEY)"
-                    if col['notnull']:
-                        schema_info += " NOT NULL"
-                    if col['dflt_value']:
-                        schema_info += f" DEFAULT {col['dflt_value']}"
-                    schema_info += "\n"
-                
-                schema_info += "\n"
-            
-            # Get table row counts
-            schema_info += "Table row counts:\n"
-            for table in tables:
-                table_name = table['name']
-                count_query = f"SELECT COUNT(*) as count FROM {table_name}"
-                count_result = sales_tools._execute_query(count_query)
-                row_count = count_result[0]['count'] if count_result else 0
-                schema_info += f"  - {table_name}: {row_count} rows\n"
+                line = f"  - {col['name']}: {col['type']}"
+                if col['pk']:
+                    line += " (PRIMARY KEY)"
+                if col['notnull']:
+                    line += " NOT NULL"
+                if col['dflt_value']:
+                    line += f" DEFAULT {col['dflt_value']}"
+                lines.append(line)
+            
+            if table_names:
+                lines.append("")
+            
+            lines.append("Table row counts:")
+            for count in counts:
+                lines.append(f"  - {count['table_name']}: {count['count']} rows")
             
             # Add important notes about date queries
-            schema_info += """
-⚠️ IMPORTANTE - CONSULTAS DE DATA:
-- A coluna 'sale_date' contém TIMESTAMPS completos (YYYY-MM-DD HH:MM:SS)
-- Para consultas por período, use funções de data do SQLite:
-  * strftime('%Y-%m', sale_date) para filtrar por mês
-  * date(sale_date) para filtrar por dia
-  * EVITE usar BETWEEN com strings de data!
-
-EXEMPLOS SEGUROS:
-✅ SELECT * FROM sales WHERE strftime('%Y-%m', sale_date) = '2025-02'
-✅ SELECT * FROM sales WHERE date(sale_date) = '2025-02-28'
-❌ SELECT * FROM sales WHERE sale_date BETWEEN '2025-02-01' AND '2025-02-28'
-"""
+            lines.append("")
+            lines.append(SCHEMA_DATE_QUERY_NOTES)
             
-            return schema_info
+            return "\n".join(lines)
             
         except Exception as e:
             error_msg = f"Error getting database schema: {str(e)}"
@@ -164,25 +816,29 @@ EXEMPLOS SEGUROS:
             return error_msg
 
     @mcp.tool()
-    def get_sales_statistics() -> str:
+    async def get_sales_statistics() -> str:
         """
         Get general sales statistics from the database.
         
         Returns:
             Formatted string with key sales metrics
         """
+        cache_key = ("get_sales_statistics", date.today().isoformat())
+        cached = sales_tools.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            stats = {}
-            
-            # Total sales count
-            total_query = "SELECT COUNT(*) as total FROM sales"
-            total_result = sales_tools._execute_query(total_query)
-            stats['total_orders'] = total_result[0]['total'] if total_result else 0
+            rows = await sales_tools.run(sales_tools._execute_query, SALES_STATISTICS_QUERY)
+            # Fixed column order of SALES_STATISTICS_QUERY, unpacked from the raw tuple
+            (total_orders, total_revenue, min_date, max_date, total_products, total_customers), = rows.rows
             
-            # Total revenue
-            revenue_query = "SELECT SUM(total_amount) as revenue FROM sales"
-            revenue_result = sales_tools._execute_query(revenue_query)
-            stats['total_revenue'] = revenue_result[0]['revenue'] if revenue_result else 0
+            stats = {
+                'total_orders': total_orders,
+                'total_revenue': total_revenue,
+                'total_products': total_products,
+                'total_customers': total_customers
+            }
             
             # Average order value
             if stats['total_orders'] > 0:
@@ -190,33 +846,26 @@ EXEMPLOS SEGUROS:
             else:
                 stats['average_order_value'] = 0
             
-            # Product count
-            product_query = "SELECT COUNT(*) as count FROM products"
-            product_result = sales_tools._execute_query(product_query)
-            stats['total_products'] = product_result[0]['count'] if product_result else 0
-            
-            # Customer count
-            customer_query = "SELECT COUNT(*) as count FROM customers"
-            customer_result = sales_tools._execute_query(customer_query)
-            stats['total_customers'] = customer_result[0]['count'] if customer_result else 0
-            
             # Date range
-            date_query = "SELECT MIN(sale_date) as min_date, MAX(sale_date) as max_date FROM sales"
-            date_result = sales_tools._execute_query(date_query)
-            if date_result and date_result[0]['min_date']:
-                stats['date_range'] = f"{date_result[0]['min_date']} to {date_result[0]['max_date']}"
+            if min_date:
+                stats['date_range'] = f"{min_date} to {max_date}"
             else:
                 stats['date_range'] = "No sales data"
             
             # Format statistics
-            stats_text = "Sales Database Statistics:\n\n"
-            stats_text += f"📊 Total Orders: {stats['total_orders']:,}\n"
-            stats_text += f"💰 Total Revenue: ${stats['total_revenue']:,.2f}\n"
-            stats_text += f"📈 Average Order Value: ${stats['average_order_value']:,.2f}\n"
-            stats_text += f"📦 Total Products: {stats['total_products']}\n"
-            stats_text += f"👥 Total Customers: {stats['total_customers']}\n"
-            stats_text += f"📅 Date Range: {stats['date_range']}\n"
-            
+            stats_text = "\n".join([
+                "Sales Database Statistics:",
+                "",
+                f"📊 Total Orders: {stats['total_orders']:,}",
+                f"💰 Total Revenue: ${stats['total_revenue']:,.2f}",
+                f"📈 Average Order Value: ${stats['average_order_value']:,.2f}",
+                f"📦 Total Products: {stats['total_products']}",
+                f"👥 Total Customers: {stats['total_customers']}",
+                f"📅 Date Range: {stats['date_range']}",
+                ""
+            ])
+            
+            sales_tools.cache.set(cache_key, stats_text)
             return stats_text
             
         except Exception as e:
@@ -225,54 +874,60 @@ EXEMPLOS SEGUROS:
             return error_msg
 
     @mcp.tool()
-    def analyze_sales_trends() -> str:
+    async def analyze_sales_trends() -> str:
         """
         Analyze sales trends over time.
         
         Returns:
             Formatted analysis of sales trends
         """
+        cache_key = ("analyze_sales_trends", date.today().isoformat())
+        cached = sales_tools.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            # Get sales by month
-            monthly_query = """
-            SELECT 
-                strftime('%Y-%m', sale_date) as month,
-                COUNT(*) as orders,
-                SUM(total_amount) as revenue,
-                AVG(total_amount) as avg_order_value
-            FROM sales 
-            GROUP BY strftime('%Y-%m', sale_date)
-            ORDER BY month
-            """
-            
-            monthly_results = sales_tools._execute_query(monthly_query)
-            
-            if not monthly_results:
+            # Get sales by month from the pre-aggregated rollup (or straight from sales as a fallback)
+            rollups_ready = await sales_tools.run(sales_tools.ensure_rollups)
+            monthly_query = MONTHLY_TRENDS_QUERY if rollups_ready else MONTHLY_TRENDS_FROM_SALES_QUERY
+            
+            def monthly_lines() -> Tuple[List[str], int, Optional[tuple]]:
+                # Formats each batch as it is fetched, so only one batch of rows is held at a time
+                lines = ["Sales Trends Analysis:", "", "Monthly Performance:"]
+                month_count = 0
+                latest_month = None
+                for _, rows in sales_tools._iter_batches(monthly_query):
+                    # Straight from the result tuples (month, orders, revenue_cents, avg_order_value_cents, ...):
+                    # no per-month dict or float arithmetic, only the formatting
+                    lines.extend(
+                        f"  {month}: {orders} orders, ${_format_cents(revenue_cents or 0)} revenue, "
+                        f"${_format_cents(avg_cents or 0)} avg"
+                        for month, orders, revenue_cents, avg_cents, *_ in rows
+                    )
+                    month_count += len(rows)
+                    latest_month = rows[-1]
+                return lines, month_count, latest_month
+            
+            lines, month_count, latest_month = await sales_tools.run(monthly_lines)
+            
+            if not month_count:
                 return "No sales data available for trend analysis."
             
-            trend_text = "Sales Trends Analysis:\n\n"
-            trend_text += "Monthly Performance:\n"
-            
-            for month_data in monthly_results:
-                month = month_data['month']
-                orders = month_data['orders']
-                revenue = month_data['revenue'] or 0
-                avg_value = month_data['avg_order_value'] or 0
+            # Growth of the latest month, already computed by the query
+            if month_count >= 2:
+                *_, order_growth, revenue_growth = latest_month
+                order_growth = order_growth or 0
+                revenue_growth = revenue_growth or 0
                 
-                trend_text += f"  {month}: {orders} orders, ${revenue:,.2f} revenue, ${avg_value:.2f} avg\n"
+                lines.append("")
+                lines.append("Month-over-Month Growth:")
+                lines.append(f"  Orders: {order_growth:+.1f}%")
+                lines.append(f"  Revenue: {revenue_growth:+.1f}%")
             
-            # Calculate growth trends
-            if len(monthly_results) >= 2:
-                latest_month = monthly_results[-1]
-                previous_month = monthly_results[-2]
-                
-                order_growth = ((latest_month['orders'] - previous_month['orders']) / previous_month['orders'] * 100) if previous_month['orders'] > 0 else 0
-                revenue_growth = ((latest_month['revenue'] - previous_month['revenue']) / previous_month['revenue'] * 100) if previous_month['revenue'] > 0 else 0
-                
-                trend_text += f"\nMonth-over-Month Growth:\n"
-                trend_text += f"  Orders: {order_growth:+.1f}%\n"
-                trend_text += f"  Revenue: {revenue_growth:+.1f}%\n"
+            lines.append("")
+            trend_text = "\n".join(lines)
             
+            sales_tools.cache.set(cache_key, trend_text)
             return trend_text
             
         except Exception as e:
@@ -281,7 +936,7 @@ EXEMPLOS SEGUROS:
             return error_msg
 
     @mcp.tool()
-    def get_sales_by_period(period_type: str, period_value: str) -> str:
+    async def get_sales_by_period(period_type: str, period_value: str) -> str:
         """
         Get sales data for specific periods with timestamp-safe queries.
         
@@ -305,76 +960,15 @@ EXEMPLOS SEGUROS:
             - get_sales_by_period('year', '2025') -> All 2025 sales
         """
         try:
-            if period_type == 'month':
-                # Format: '2025-02'
-                query = """
-                SELECT 
-                    COUNT(*) as total_sales,
-                    SUM(quantity) as total_items,
-                    SUM(total_amount) as total_revenue,
-                    AVG(total_amount) as avg_order_value,
-                    MIN(sale_date) as first_sale,
-                    MAX(sale_date) as last_sale
-                FROM sales 
-                WHERE strftime('%Y-%m', sale_date) = ?
-                """
-                params = (period_value,)
-                period_display = f"mês {period_value}"
-                
-            elif period_type == 'day':
-                # Format: '2025-02-28'
-                query = """
-                SELECT 
-                    COUNT(*) as total_sales,
-                    SUM(quantity) as total_items,
-                    SUM(total_amount) as total_revenue,
-                    AVG(total_amount) as avg_order_value,
-                    MIN(sale_date) as first_sale,
-                    MAX(sale_date) as last_sale
-                FROM sales 
-                WHERE date(sale_date) = ?
-                """
-                params = (period_value,)
-                period_display = f"dia {period_value}"
-                
-            elif period_type == 'year':
-                # Format: '2025'
-                query = """
-                SELECT 
-                    COUNT(*) as total_sales,
-                    SUM(quantity) as total_items,
-                    SUM(total_amount) as total_revenue,
-                    AVG(total_amount) as avg_order_value,
-                    MIN(sale_date) as first_sale,
-                    MAX(sale_date) as last_sale
-                FROM sales 
-                WHERE strftime('%Y', sale_date) = ?
-                """
-                params = (period_value,)
-                period_display = f"ano {period_value}"
-                
-            elif period_type == 'week':
-                # Format: '2025-02-24' (any day in the week)
-                # Get the Monday of the week containing this date
-                query = """
-                SELECT 
-                    COUNT(*) as total_sales,
-                    SUM(quantity) as total_items,
-                    SUM(total_amount) as total_revenue,
-                    AVG(total_amount) as avg_order_value,
-                    MIN(sale_date) as first_sale,
-                    MAX(sale_date) as last_sale
-                FROM sales 
-                WHERE date(sale_date) >= date(?, 'weekday 0', '-6 days')
-                AND date(sale_date) <= date(?, 'weekday 0')
-                """
-                params = (period_value, period_value)
-                period_display = f"semana que contém {period_value}"
-                
-            else:
+            handler = PERIOD_HANDLERS.get(period_type)
+            if handler is None:
                 return f"Erro: Tipo de período '{period_type}' não suportado. Use 'month', 'day', 'year' ou 'week'."
             
-            results = sales_tools._execute_query(query, params)
+            query, make_params, make_display = handler
+            params = make_params(period_value)
+            period_display = make_display(period_value)
+            
+            results = await sales_tools.run(sales_tools._execute_query, query, params)
             
             if not results or not results[0]['total_sales']:
                 return f"❌ Nenhuma venda encontrada para o {period_display}."
@@ -382,23 +976,25 @@ EXEMPLOS SEGUROS:
             result = results[0]
             
             # Format the response in Portuguese
-            response = f"""📊 Resumo de Vendas - {period_display.title()}:
-
-🛒 Total de Vendas: {result['total_sales']}
-📦 Itens Vendidos: {result['total_items'] or 0}
-💰 Faturamento Total: R$ {result['total_revenue']:,.2f}
-📈 Ticket Médio: R$ {result['avg_order_value']:,.2f}"""
-
+            lines = [
+                f"📊 Resumo de Vendas - {period_display.title()}:",
+                "",
+                f"🛒 Total de Vendas: {result['total_sales']}",
+                f"📦 Itens Vendidos: {result['total_items'] or 0}",
+                f"💰 Faturamento Total: R$ {result['total_revenue']:,.2f}",
+                f"📈 Ticket Médio: R$ {result['avg_order_value']:,.2f}"
+            ]
+            
             # Add date range if available
             if result['first_sale'] and result['last_sale']:
                 first_date = result['first_sale'][:10]  # Get just the date part
                 last_date = result['last_sale'][:10]
                 if first_date == last_date:
-                    response += f"\n📅 Data: {first_date}"
+                    lines.append(f"📅 Data: {first_date}")
                 else:
-                    response += f"\n📅 Período: {first_date} a {last_date}"
+                    lines.append(f"📅 Período: {first_date} a {last_date}")
             
-            return response
+            return "\n".join(lines)
             
         except Exception as e:
             error_msg = f"Erro ao buscar vendas por período: {str(e)}"
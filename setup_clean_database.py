@@ -4,19 +4,29 @@ Script para configurar o banco de dados com apenas os dados do script_dump_banco
 import sqlite3
 import os
 from datetime import datetime
+from functools import lru_cache
 
-def create_clean_database():
-    """Cria o banco de dados limpo com apenas os dados do script original"""
-    
-    # Remove o banco existente se existir
-    if os.path.exists('sales.db'):
-        os.remove('sales.db')
-        print("✓ Banco de dados anterior removido")
+from app.rollups import refresh_rollups
+from app.seed_data import (
+    PRODUCTS_INSERT, PRODUCTS_DATA, CUSTOMERS_INSERT, CUSTOMERS_DATA,
+    SALES_INSERT, SALES_COLUMNS, SALES_COUNT
+)
+
+@lru_cache(maxsize=1)
+def build_clean_database() -> sqlite3.Connection:
+    """
+    Monta o banco limpo em memória (uma única vez por processo)
     
-    # Conecta ao banco (cria se não existir)
-    conn = sqlite3.connect('sales.db')
+    O resultado serve de modelo: create_clean_database copia suas páginas
+    para o disco com a API de backup, sem repetir nenhum comando SQL.
+    """
+    # Autocommit mode: a única transação é aberta e fechada explicitamente abaixo
+    conn = sqlite3.connect(':memory:', isolation_level=None)
     cursor = conn.cursor()
     
+    # Estrutura, dados, índices e agregados em uma só transação
+    cursor.execute("BEGIN")
+    
     print("📝 Criando estrutura do banco de dados...")
     
     # Cria as tabelas exatamente como no script original
@@ -53,89 +63,60 @@ def create_clean_database():
     print("✓ Tabelas criadas")
     
     # Insere dados dos produtos (exatamente como no script)
-    products_data = [
-        ('SKU001', 'Product A', 'Category 1', 10.99),
-        ('SKU002', 'Product B', 'Category 1', 20.50),
-        ('SKU003', 'Product C', 'Category 2', 15.75),
-        ('SKU004', 'Product D', 'Category 3', 30.00),
-        ('SKU005', 'Product E', 'Category 4', 25.00)
-    ]
-    
-    cursor.executemany(
-        "INSERT INTO products (sku, name, category, price) VALUES (?, ?, ?, ?)",
-        products_data
-    )
-    print("✓ Produtos inseridos: 5 registros")
+    cursor.executemany(PRODUCTS_INSERT, PRODUCTS_DATA)
+    print(f"✓ Produtos inseridos: {len(PRODUCTS_DATA)} registros")
     
     # Insere dados dos clientes (exatamente como no script)
-    customers_data = [
-        ('John Doe', 'john@example.com'),
-        ('Jane Smith', 'jane@example.com'),
-        ('Bob Johnson', 'bob@example.com'),
-        ('Alice Brown', 'alice@example.com'),
-        ('Charlie Davis', 'charlie@example.com')
-    ]
-    
-    cursor.executemany(
-        "INSERT INTO customers (name, email) VALUES (?, ?)",
-        customers_data
-    )
-    print("✓ Clientes inseridos: 5 registros")
-    
-    # Insere dados de vendas (exatamente como no script)
-    sales_data = [
-        (4, 1, 4, 120.00, '2025-01-17 12:22:49'),
-        (5, 1, 7, 175.00, '2025-01-28 04:04:17'),
-        (5, 4, 4, 100.00, '2025-02-04 11:58:16'),
-        (1, 2, 2, 21.98, '2025-01-05 10:30:45'),
-        (2, 3, 1, 20.50, '2025-01-06 15:15:10'),
-        (3, 5, 3, 47.25, '2025-01-08 09:45:22'),
-        (4, 2, 1, 30.00, '2025-01-10 17:22:30'),
-        (5, 4, 5, 125.00, '2025-01-12 11:00:00'),
-        (1, 3, 2, 21.98, '2025-01-14 18:25:45'),
-        (2, 5, 6, 123.00, '2025-01-15 13:12:22'),
-        (3, 1, 2, 31.50, '2025-01-18 08:10:33'),
-        (4, 4, 1, 30.00, '2025-01-20 14:05:20'),
-        (5, 2, 3, 75.00, '2025-01-23 19:30:40'),
-        (1, 5, 2, 21.98, '2025-01-25 10:45:10'),
-        (2, 4, 4, 82.00, '2025-01-29 16:20:50'),
-        (3, 2, 1, 15.75, '2025-02-01 12:00:00'),
-        (4, 5, 2, 60.00, '2025-02-03 18:40:30'),
-        (5, 1, 8, 200.00, '2025-02-05 11:25:00'),
-        (1, 4, 3, 32.97, '2025-02-07 14:50:10'),
-        (2, 3, 2, 41.00, '2025-02-08 10:20:15'),
-        (3, 5, 4, 63.00, '2025-02-10 16:45:55'),
-        (4, 2, 1, 30.00, '2025-02-12 20:30:00'),
-        (5, 3, 2, 50.00, '2025-02-15 09:10:10'),
-        (1, 1, 6, 65.94, '2025-02-16 13:35:30'),
-        (2, 4, 2, 41.00, '2025-02-18 15:00:00'),
-        (3, 2, 3, 47.25, '2025-02-19 11:30:45'),
-        (4, 5, 2, 60.00, '2025-02-21 14:10:22'),
-        (5, 4, 1, 25.00, '2025-02-22 19:45:55'),
-        (1, 2, 7, 76.93, '2025-02-24 12:10:10'),
-        (2, 1, 4, 82.00, '2025-02-25 17:30:50'),
-        (3, 3, 5, 78.75, '2025-02-27 09:55:00'),
-        (4, 5, 3, 90.00, '2025-02-28 14:25:30'),
-        (5, 2, 9, 225.00, '2025-03-02 10:00:00')
-    ]
-    
-    cursor.executemany(
-        "INSERT INTO sales (product_id, customer_id, quantity, total_amount, sale_date) VALUES (?, ?, ?, ?, ?)",
-        sales_data
-    )
-    print("✓ Vendas inseridas: 33 registros")
-    
-    # Commit e fechar
-    conn.commit()
-    conn.close()
+    cursor.executemany(CUSTOMERS_INSERT, CUSTOMERS_DATA)
+    print(f"✓ Clientes inseridos: {len(CUSTOMERS_DATA)} registros")
+    
+    # Insere dados de vendas (exatamente como no script): um INSERT preparado,
+    # com as linhas montadas coluna a coluna
+    cursor.executemany(SALES_INSERT, zip(*SALES_COLUMNS))
+    print(f"✓ Vendas inseridas: {SALES_COUNT} registros")
+    
+    # Índices para filtros por data e agregações por produto
+    # (criados após a carga: construir o índice de uma vez é mais rápido que mantê-lo a cada INSERT)
+    cursor.execute("CREATE INDEX ix_sales_date_amount ON sales (sale_date, total_amount, quantity)")
+    cursor.execute("CREATE INDEX ix_sales_product_date ON sales (product_id, sale_date, quantity, total_amount)")
+    cursor.execute("CREATE INDEX ix_sales_customer_id ON sales (customer_id)")
+    print("✓ Índices criados")
+    
+    # Tabelas agregadas usadas pelas ferramentas de análise
+    refresh_rollups(conn)
+    print("✓ Tabelas agregadas atualizadas")
+    
+    # Estatísticas para o planejador de consultas escolher os índices
+    cursor.execute("ANALYZE")
+    
+    cursor.execute("COMMIT")
+    return conn
+
+def create_clean_database(path: str = 'sales.db'):
+    """Cria o banco de dados limpo com apenas os dados do script original"""
+    
+    # Remove o banco existente se existir
+    if os.path.exists(path):
+        os.remove(path)
+        print("✓ Banco de dados anterior removido")
+    
+    template = build_clean_database()
+    
+    # Conecta ao banco (cria se não existir) e copia o modelo página a página
+    disk = sqlite3.connect(path)
+    # Cópia única de um banco descartável: sem fsync nem journal em disco
+    disk.execute("PRAGMA journal_mode = MEMORY")
+    disk.execute("PRAGMA synchronous = OFF")
+    template.backup(disk)
+    disk.close()
     
     print("\n🎉 Banco de dados criado com sucesso!")
     print(f"📊 Resumo:")
-    print(f"   • 5 produtos")
-    print(f"   • 5 clientes") 
-    print(f"   • 33 vendas")
+    print(f"   • {len(PRODUCTS_DATA)} produtos")
+    print(f"   • {len(CUSTOMERS_DATA)} clientes")
+    print(f"   • {SALES_COUNT} vendas")
     print(f"   • Período: 2025-01-05 a 2025-03-02")
-    print(f"   • Arquivo: sales.db")
+    print(f"   • Arquivo: {path}")
 
 def verify_database():
     """Verifica se o banco foi criado corretamente"""